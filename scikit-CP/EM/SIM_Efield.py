@@ -3,24 +3,138 @@
 #   Creation Date: 25/October/2018
 #   Description: Numerical simulation script of electric field and potential
 import numpy as np
+import os
+import tempfile
+import weakref
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
+from EM.relaxation import SWEEPS, SLAB_SWEEPS, optimal_omega, update_norm, interior
+from EM import multigrid
+from EM.parallel import SlabRelaxation
+from EM.cache import interpolate, geometry_key
+from EM.fieldlines import trace_field_lines, electrode_seeds, equipotentials
+
+
+def _remove(path):
+    """
+    Deletes a memmap file of a grid, if it is still there
+    """
+    try:
+        os.remove(path)
+    except OSError:
+        pass
 
 
 class EField:
-    def __init__(self, i_size):
+    def __init__(self, i_size, dtype=np.float64, memmap_dir=None, slab=None, cache=None):
         """
+            - The 2D and 3D grids are only allocated the first time they are used
         :param i_size: size of the grid for field simulation. I.e. the number of available points for writing
+        :param dtype: floating point type of the potential grids, e.g. np.float32 to halve their memory
+        :param memmap_dir: directory in which the grids are kept as numpy.memmap files instead of in memory.
+                           Relaxation sweeps on these grids run one slab of planes at a time (out-of-core).
+                           Every instance gets files of its own (V_2d_*.dat..., see self.memmap_paths), so instances
+                           can share it. The files are deleted by close(), on leaving a with block, or once the
+                           instance is garbage collected or the interpreter exits
+        :param slab: number of planes per slab for out-of-core sweeps. Picked to hold about 64 MB if None
+        :param cache: EM.cache.SolutionCache shared by the solves, which are then skipped when the same problem
+                      was solved before and warm started from the latest solution of the same conductors
         """
         self.dim = i_size
-        self.V_2d = np.zeros((self.dim, self.dim))
-        self.V_3d = np.zeros((self.dim, self.dim, self.dim))
+        self.dtype = np.dtype(dtype)
+        self.memmap_dir = memmap_dir
+        if slab is None:
+            slab = max(1, (64 * 2 ** 20) // (self.dim ** 2 * self.dtype.itemsize))
+        self.slab = slab
+        self.cache = cache
+        self.__grids = {}
+        # name of every grid held in a memmap file -> path of the file
+        self.memmap_paths = {}
+        self.__finalizers = {}
         self.V1 = 1
         self.V2 = -1
         self.z_switch = False
-        self.E_x = []
-        self.E_y = []
-        self.E_z = []
+        self.E_x = None
+        self.E_y = None
+        self.E_z = None
+        self.E_mag = None
+        self.u_E = None
+        self.residual_history = np.zeros(0)
+        self.rho_2d = None
+        self.rho_3d = None
+        self.__systems = {}
+
+    def __grid(self, name, ndim, dtype):
+        """
+        Returns a grid, allocating it filled with zeros on first use
+        :param name: name of the grid
+        :param ndim: 2 or 3
+        :param dtype: data type of the grid
+        """
+        if name not in self.__grids:
+            shape = (self.dim,) * ndim
+            if self.memmap_dir is None:
+                self.__grids[name] = np.zeros(shape, dtype=dtype)
+            else:
+                # a unique file, never one of another instance still mapping it
+                handle, path = tempfile.mkstemp(suffix=".dat", prefix=name + "_", dir=self.memmap_dir)
+                os.close(handle)
+                self.__finalizers[name] = weakref.finalize(self, _remove, path)
+                self.memmap_paths[name] = path
+                self.__grids[name] = np.memmap(path, dtype=dtype, mode="w+", shape=shape)
+        return self.__grids[name]
+
+    def close(self):
+        """
+        Drops the grids and deletes their memmap files. The grids are allocated again, filled with zeros, if
+        used afterwards; arrays of the old grids must not be used any more
+        """
+        self.__grids.clear()
+        self.__systems.clear()
+        for remove in self.__finalizers.values():
+            remove()
+        self.__finalizers.clear()
+        self.memmap_paths.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __set_grid(self, name, value):
+        """
+        Replaces a grid, writing into the existing memmap file when the grids live on disk
+        """
+        if self.memmap_dir is not None and name in self.__grids:
+            if value is not self.__grids[name]:
+                self.__grids[name][...] = value
+        else:
+            self.__grids[name] = value
+
+    @property
+    def V_2d(self):
+        return self.__grid("V_2d", 2, self.dtype)
+
+    @V_2d.setter
+    def V_2d(self, value):
+        self.__set_grid("V_2d", value)
+
+    @property
+    def V_3d(self):
+        return self.__grid("V_3d", 3, self.dtype)
+
+    @V_3d.setter
+    def V_3d(self, value):
+        self.__set_grid("V_3d", value)
+
+    @property
+    def fixed_2d(self):
+        return self.__grid("fixed_2d", 2, bool)
+
+    @property
+    def fixed_3d(self):
+        return self.__grid("fixed_3d", 3, bool)
 
     def set_capacitor_lines(self, L1, L2, V1, V2, D, W1=1, W2=1):
         """
@@ -47,8 +161,8 @@ class EField:
         # print(pos2, ":", pos2 + W2)
         # print(center-L1, ":", center+L1)
         # print(center-L2, ":", center+L2)
-        self.V_2d[pos1:pos1 + W1, center - L1:center + L1] = self.V1
-        self.V_2d[pos2:pos2 + W2, center - L2:center + L2] = self.V2
+        self.add_conductor((slice(pos1, pos1 + W1), slice(center - L1, center + L1)), self.V1)
+        self.add_conductor((slice(pos2, pos2 + W2), slice(center - L2, center + L2)), self.V2)
 
     def set_capacitor_plates(self, L1, L2, V1, V2, D, W1=1, W2=1):
         """
@@ -72,76 +186,352 @@ class EField:
             L2 = int(L2 / 2)
         pos1 = int((self.dim / 2) + (D / 2))
         pos2 = int((self.dim / 2) - (D / 2))
-        self.V_3d[pos1:pos1 + W1, center - L1:center + L1, center - L1:center+L1] = self.V1
-        self.V_3d[pos2:pos2 + W2, center - L2:center + L2, center - L2:center+L2] = self.V2
+        self.add_conductor((slice(pos1, pos1 + W1), slice(center - L1, center + L1),
+                            slice(center - L1, center + L1)), self.V1)
+        self.add_conductor((slice(pos2, pos2 + W2), slice(center - L2, center + L2),
+                            slice(center - L2, center + L2)), self.V2)
 
-    def surface_potential(self, num_iter):
+    def add_conductor(self, region, voltage):
+        """
+        Places a conductor of any shape held at a fixed voltage on the surface or in the space
+            - The region is a boolean mask the shape of the grid, or an index into it (a tuple of 2 or 3
+              slices/index arrays). The dimension of the region picks the 2D or the 3D grid
+        :param region: nodes of the conductor
+        :param voltage: voltage of the conductor
+        """
+        if isinstance(region, np.ndarray) and region.dtype == bool:
+            ndim = region.ndim
+        elif isinstance(region, tuple):
+            ndim = len(region)
+        else:
+            raise TypeError("Region must be a boolean mask or a tuple of indices")
+        if ndim == 2:
+            self.V_2d[region] = voltage
+            self.fixed_2d[region] = True
+        elif ndim == 3:
+            self.z_switch = True
+            self.V_3d[region] = voltage
+            self.fixed_3d[region] = True
+        else:
+            raise ValueError("Region must be 2D or 3D")
+
+    def clear_conductors(self):
+        """
+        Removes every conductor and resets the potentials and the charge densities to zero
+        """
+        for grid in self.__grids.values():
+            grid[...] = 0
+        self.rho_2d = None
+        self.rho_3d = None
+
+    def set_charge_density(self, rho, epsilon=1.0, ds=1.0):
+        """
+        Sets the charge density of the Poisson equation laplacian(V) = -rho / epsilon
+        :param rho: charge density array the shape of the 2D or the 3D grid
+        :param epsilon: permittivity of the medium
+        :param ds: step size of the grid
+        """
+        rho = np.asarray(rho, dtype=self.dtype)
+        # the solvers work with the source term scaled by the squared grid step
+        if rho.shape == (self.dim, self.dim):
+            self.rho_2d = rho * (ds ** 2 / epsilon)
+        elif rho.shape == (self.dim, self.dim, self.dim):
+            self.rho_3d = rho * (ds ** 2 / epsilon)
+        else:
+            raise ValueError("Charge density must have the shape of the 2D or the 3D grid")
+
+    def surface_potential(self, num_iter, method="gauss_seidel", tol=None, norm="max", omega=None,
+                          warm_start=None):
         """
         calculates the electric field potential on surface
-        :param num_iter: number of iterations of the numerical method calculations
+        :param num_iter: number of iterations (sweeps, or V-cycles for multigrid). Upper limit when tol is set
+        :param method: "gauss_seidel" (node by node), "jacobi", "red_black", "sor" (vectorized sweeps),
+                       "multigrid" (V-cycles), "fmg" (full multigrid followed by V-cycles),
+                       "direct" (sparse LU) or "cg" (conjugate gradients, tol is then relative to the residual)
+        :param tol: stops the iterations once the norm of the update of a sweep falls below tol
+        :param norm: norm of the update used with tol: "max" or "l2" (root mean square)
+        :param omega: over-relaxation factor for "sor". Picked from the grid size if None
+        :param warm_start: initial guess of the potential, e.g. a solution on a coarser grid (interpolated)
         """
-        V = self.V_2d
-        for n in range(num_iter):
-            for i in range(1, self.dim-1):
-                for j in range(1, self.dim-1):
-                    if V[i][j] == self.V1 or V[i][j] == self.V2:
-                        continue
-                    else:
-                        V[i][j] = (V[i + 1][j] + V[i - 1][j] +
-                                   V[i][j + 1] + V[i][j - 1]) * (1 / 4)
-        self.V_2d = V
+        self.V_2d = self.__relax(self.V_2d, num_iter, method, tol, norm, omega, None, warm_start)
         return self.V_2d
 
-    def space_potential(self, num_iter):
+    def space_potential(self, num_iter, method="gauss_seidel", tol=None, norm="max", omega=None, workers=None,
+                        warm_start=None):
         """
         calculates the electric field potential in space
-        :param num_iter: number of iterations of the numerical method calculations
+        :param num_iter: number of iterations (sweeps, or V-cycles for multigrid). Upper limit when tol is set
+        :param method: "gauss_seidel" (node by node), "jacobi", "red_black", "sor" (vectorized sweeps),
+                       "multigrid" (V-cycles), "fmg" (full multigrid followed by V-cycles),
+                       "direct" (sparse LU) or "cg" (conjugate gradients, tol is then relative to the residual)
+        :param tol: stops the iterations once the norm of the update of a sweep falls below tol
+        :param norm: norm of the update used with tol: "max" or "l2" (root mean square)
+        :param omega: over-relaxation factor for "sor". Picked from the grid size if None
+        :param workers: number of processes relaxing slabs of the space concurrently, for "red_black" and "sor"
+        :param warm_start: initial guess of the potential, e.g. a solution on a coarser grid (interpolated)
         """
-        V = self.V_3d
-        for n in range(num_iter):
-            for i in range(1, self.dim-1):
-                for j in range(1, self.dim-1):
-                    for k in range(1, self.dim-1):
-                        if V[i][j][k] == self.V1 or V[i][j][k] == self.V2:
-                            continue
-                        else:
-                            V[i][j][k] = (V[i + 1][j][k] + V[i - 1][j][k] +
-                                          V[i][j + 1][k] + V[i][j - 1][k] +
-                                          V[i][j][k + 1] + V[i][j][k - 1]) * (1/6)
-        self.V_3d = V
+        self.V_3d = self.__relax(self.V_3d, num_iter, method, tol, norm, omega, workers, warm_start)
         return self.V_3d
 
-    def surface_field(self, ds):
+    def __gauss_seidel_2d(self, V, fixed, omega=1.0, rhs=None):
         """
-        calculates the electric field on surface
-        :param ds: step size for Electric field calculation
+        One node by node Gauss-Seidel sweep over the surface
         """
-        V = self.V_2d
+        V_old = V.copy()
         for i in range(1, self.dim-1):
             for j in range(1, self.dim-1):
-                if V[i][j] == self.V1 or V[i][j] == self.V2:
+                if fixed[i][j]:
                     continue
                 else:
-                    self.E_x.append(-1 * ((V[i - 1][j] - V[i + 1][j]) * (1 / (2 * ds))))
-                    self.E_y.append(-1 * ((V[i][j - 1] - V[i][j + 1]) * (1 / (2 * ds))))
-        return [self.E_x, self.E_y]
+                    V[i][j] = (V[i + 1][j] + V[i - 1][j] +
+                               V[i][j + 1] + V[i][j - 1] +
+                               (0 if rhs is None else rhs[i][j])) * (1 / 4)
+        delta = V - V_old
+        return np.abs(delta).max(), float(np.vdot(delta, delta))
 
-    def space_field(self, ds):
+    def __gauss_seidel_3d(self, V, fixed, omega=1.0, rhs=None):
         """
-        calculates the electric field in space
-        :param ds: step size for Electric field calculation
+        One node by node Gauss-Seidel sweep over the space
         """
-        V = self.V_3d
+        V_old = V.copy()
         for i in range(1, self.dim-1):
             for j in range(1, self.dim-1):
                 for k in range(1, self.dim-1):
-                    if V[i][j][k] == self.V1 or V[i][j][k] == self.V2:
+                    if fixed[i][j][k]:
                         continue
                     else:
-                        self.E_x.append(-1 * ((V[i - 1][j][k] - V[i + 1][j][k]) * (1 / (2 * ds))))
-                        self.E_y.append(-1 * ((V[i][j - 1][k] - V[i][j + 1][k]) * (1 / (2 * ds))))
-                        self.E_z.append(-1 * ((V[i][j][k - 1] - V[i][j][k + 1]) * (1 / (2 * ds))))
-        return [self.E_x, self.E_y, self.E_z]
+                        V[i][j][k] = (V[i + 1][j][k] + V[i - 1][j][k] +
+                                      V[i][j + 1][k] + V[i][j - 1][k] +
+                                      V[i][j][k + 1] + V[i][j][k - 1] +
+                                      (0 if rhs is None else rhs[i][j][k])) * (1/6)
+        delta = V - V_old
+        return np.abs(delta).max(), float(np.vdot(delta, delta))
+
+    def __relax(self, V, num_iter, method, tol=None, norm="max", omega=None, workers=None, warm_start=None):
+        """
+        Solves a potential grid, going through the solution cache when there is one
+            - The norm of the update of every sweep is kept in self.residual_history
+        :param V: 2D or 3D potential array
+        :param num_iter: largest number of sweeps
+        :param method: name of the sweep, "multigrid", "fmg", "direct" or "cg"
+        :param tol: convergence threshold on the norm of the update, None to always run num_iter sweeps
+        :param norm: "max" or "l2"
+        :param omega: relaxation factor for "sor"
+        :param workers: number of processes for "red_black" and "sor", None or 1 for a serial run
+        :param warm_start: initial guess, interpolated onto the grid if its size differs
+        :return: the relaxed potential array
+        """
+        if V.ndim == 2:
+            fixed, rhs = self.fixed_2d, self.rho_2d
+        else:
+            fixed, rhs = self.fixed_3d, self.rho_3d
+        if not fixed.any():
+            # no conductor placed through add_conductor: electrodes written straight into the grid
+            fixed = (V == self.V1) | (V == self.V2)
+
+        # tolerance the solve is asked for: direct solves are exact, cg defaults to a relative residual of 1e-10
+        # and a fixed number of sweeps only accepts an exact solution. The relative residual of cg does not
+        # bound the update norm of the sweeps, its solutions are kept under a norm of their own
+        if method == "direct" or (tol is None and method != "cg"):
+            requested = 0.0
+        else:
+            requested = 1e-10 if tol is None else tol
+        tol_norm = "cg_rel" if method == "cg" else norm
+        cached = None
+        if self.cache is not None:
+            cached, exact = self.cache.lookup(fixed, V, rhs, requested, tol_norm)
+            if exact:
+                V[...] = cached
+                self.residual_history = np.zeros(0)
+                return V
+        if warm_start is None:
+            warm_start = cached
+        if warm_start is not None:
+            inner = interior(V.ndim)
+            guess = interpolate(warm_start, V.shape).astype(V.dtype)
+            np.copyto(V[inner], guess[inner], where=~fixed[inner])
+
+        V = self.__solve(V, fixed, rhs, num_iter, method, tol, norm, omega, workers)
+        history = self.residual_history
+        if method == "direct" or (method == "cg" and history.size < num_iter) or \
+                (tol is not None and method != "cg" and history.size > 0 and history[-1] < tol):
+            # only converged solutions are worth reusing as they are
+            if self.cache is not None:
+                self.cache.put(fixed, V, rhs, requested, tol_norm)
+        return V
+
+    def __solve(self, V, fixed, rhs, num_iter, method, tol, norm, omega, workers):
+        """
+        Runs the solver picked by method on a potential grid, see __relax
+        """
+        if method in ("multigrid", "fmg"):
+            V, self.residual_history = multigrid.solve(V, fixed, num_iter, tol, norm, rhs, full=method == "fmg")
+            return V
+        elif method in ("direct", "cg"):
+            return self.__sparse_solve(V, fixed, rhs, num_iter, method, tol, norm)
+        elif method == "gauss_seidel":
+            sweep = self.__gauss_seidel_2d if V.ndim == 2 else self.__gauss_seidel_3d
+        elif method in SWEEPS and isinstance(V, np.memmap):
+            slab_sweep = SLAB_SWEEPS[method]
+
+            def sweep(V, fixed, omega, rhs):
+                return slab_sweep(V, fixed, omega, rhs, self.slab)
+        elif method in SWEEPS:
+            sweep = SWEEPS[method]
+        else:
+            raise ValueError("Unknown relaxation method: " + str(method))
+        if method != "sor":
+            omega = 1.0
+        elif omega is None:
+            omega = optimal_omega(V.shape)
+        if workers is not None and workers > 1:
+            if method not in ("red_black", "sor"):
+                raise ValueError("Only the red_black and sor methods run on several processes")
+            with SlabRelaxation(V, fixed, rhs, workers) as slabs:
+                self.residual_history = self.__iterate(lambda V, fixed, omega, rhs: slabs.sweep(omega),
+                                                       V, fixed, rhs, num_iter, tol, norm, omega)
+                V[...] = slabs.V
+            return V
+        self.residual_history = self.__iterate(sweep, V, fixed, rhs, num_iter, tol, norm, omega)
+        return V
+
+    @staticmethod
+    def __iterate(sweep, V, fixed, rhs, num_iter, tol, norm, omega):
+        """
+        Runs sweeps until num_iter sweeps are done or the norm of the update falls below tol
+        :return: the norm of the update of every sweep
+        """
+        history = []
+        for n in range(num_iter):
+            max_update, sum_sq = sweep(V, fixed, omega, rhs)
+            history.append(update_norm(max_update, sum_sq, V.size, norm))
+            if tol is not None and history[-1] < tol:
+                break
+        return np.array(history)
+
+    def __sparse_solve(self, V, fixed, rhs, num_iter, method, tol, norm):
+        """
+        Solves a potential grid as a sparse linear system.
+            - The matrix and its factorization are kept for each dimension and reused as long as the
+              conductors stay in place, so a sweep over voltages only costs back-substitutions
+        """
+        # scipy is only needed by the sparse solvers
+        from EM.sparse_laplace import LaplaceSystem
+        system = self.__systems.get(V.ndim)
+        if system is None or system.key != geometry_key(fixed):
+            system = LaplaceSystem(fixed)
+            self.__systems[V.ndim] = system
+        if method == "direct":
+            V_old = V.copy()
+            system.solve_direct(V, rhs)
+            delta = V - V_old
+            self.residual_history = np.array([update_norm(np.abs(delta).max(), float(np.vdot(delta, delta)),
+                                                          V.size, norm)])
+            return V
+        history = []
+        previous = [V.take(system.nodes)]
+
+        def record(x):
+            delta = x - previous[0]
+            history.append(update_norm(np.abs(delta).max(initial=0), float(np.vdot(delta, delta)), V.size, norm))
+            previous[0] = x.copy()
+        system.solve_cg(V, rhs, 1e-10 if tol is None else tol, num_iter, record)
+        self.residual_history = np.array(history)
+        return V
+
+    def surface_field(self, ds, magnitude=False, energy=False, epsilon=1.0):
+        """
+        calculates the electric field E = -grad(V) on surface, over the whole grid
+            - Central differences inside the grid, one sided differences on its edges
+        :param ds: step size for Electric field calculation
+        :param magnitude: also calculates |E| (self.E_mag)
+        :param energy: also calculates the energy density epsilon/2 * |E|^2 (self.u_E)
+        :param epsilon: permittivity of the medium, for the energy density
+        :return: [E_x, E_y] arrays of shape (dim, dim), followed by |E| and the energy density when asked for
+        """
+        self.E_x, self.E_y = self.__field(self.V_2d, ds)
+        self.E_z = None
+        return [self.E_x, self.E_y] + self.__field_extras([self.E_x, self.E_y], magnitude, energy, epsilon)
+
+    def space_field(self, ds, magnitude=False, energy=False, epsilon=1.0):
+        """
+        calculates the electric field E = -grad(V) in space, over the whole grid
+            - Central differences inside the grid, one sided differences on its edges
+        :param ds: step size for Electric field calculation
+        :param magnitude: also calculates |E| (self.E_mag)
+        :param energy: also calculates the energy density epsilon/2 * |E|^2 (self.u_E)
+        :param epsilon: permittivity of the medium, for the energy density
+        :return: [E_x, E_y, E_z] arrays of shape (dim, dim, dim), followed by |E| and the energy density when
+                 asked for
+        """
+        self.E_x, self.E_y, self.E_z = self.__field(self.V_3d, ds)
+        return [self.E_x, self.E_y, self.E_z] + \
+            self.__field_extras([self.E_x, self.E_y, self.E_z], magnitude, energy, epsilon)
+
+    @staticmethod
+    def __field(V, ds):
+        """
+        Minus the gradient of a potential grid, one array per axis
+        """
+        E = np.gradient(V, ds)
+        for component in E:
+            np.negative(component, out=component)
+        return E
+
+    def __field_extras(self, E, magnitude, energy, epsilon):
+        """
+        Calculates |E| and the energy density from the field components, as asked for
+        :return: list of the calculated arrays
+        """
+        extras = []
+        if not (magnitude or energy):
+            return extras
+        squared = E[0] ** 2
+        for component in E[1:]:
+            squared += component ** 2
+        if energy:
+            self.u_E = squared * (epsilon / 2)
+        if magnitude:
+            self.E_mag = np.sqrt(squared, out=squared)
+            extras.append(self.E_mag)
+        if energy:
+            extras.append(self.u_E)
+        return extras
+
+    def field_lines(self, seeds=None, step=0.5, max_steps=1000, every=1, direction=1):
+        """
+        Traces electric field lines over the solved potential, on surface or in space (see z_switch).
+            - All the lines are advanced together with Runge-Kutta steps, and end on the conductors,
+              on the edges of the grid or where the field vanishes
+        :param seeds: array of shape (num_seeds, 2 or 3) of starting points in grid index units. By default,
+                      the free nodes next to a conductor at a higher potential, where the field lines leave it
+        :param step: length of a step along the lines, in grid steps
+        :param max_steps: largest number of steps of a line
+        :param every: keeps every n-th default seed only
+        :param direction: 1 to follow the field, -1 to go against it
+        :return: lines as an array of shape (num_seeds, max_steps + 1, 2 or 3) padded with NaN after the end of
+                 every line, and the number of points of every line
+        """
+        if self.z_switch is True:
+            V, fixed = self.V_3d, self.fixed_3d
+        else:
+            V, fixed = self.V_2d, self.fixed_2d
+        if seeds is None:
+            seeds = electrode_seeds(fixed, V, every)
+        E = np.stack(self.__field(V, 1.0))
+        return trace_field_lines(E, seeds, step, max_steps, fixed, direction)
+
+    def equipotentials(self, levels, slice_pos=None):
+        """
+        Extracts the equipotential lines of the surface, or of a slice of the space
+        :param levels: list of potential values
+        :param slice_pos: position of the slice V_3d[slice_pos, :, :], None for the surface
+        :return: list with, for every level, an array of shape (num_segments, 2, 2) of line segments in grid
+                 index units, which can be drawn with matplotlib.collections.LineCollection
+        """
+        if slice_pos is None:
+            return equipotentials(self.V_2d, levels)
+        return equipotentials(self.V_3d[slice_pos, :, :], levels)
 
     def plot_potential_surface(self):
         """
@@ -162,14 +552,22 @@ class EField:
         fig.colorbar(im, ax=ax0)
         plt.show()
 
-    def plot_field(self):
+    def plot_field(self, step=1):
         """
-        plots the electric field lines.
+        plots the electric field lines of the surface, or arrows of the field in space.
+            - surface_field or space_field must be called first
+        :param step: plots every step-th node of the grid along every axis
         """
         if self.z_switch is True:
+            i, j, k = np.mgrid[0:self.dim:step, 0:self.dim:step, 0:self.dim:step]
+            s = slice(None, None, step)
             ax = plt.axes(projection='3d')
-            ax.plot3D(self.E_x, self.E_y, self.E_z, 'gray')
+            ax.quiver(i, j, k, self.E_x[s, s, s], self.E_y[s, s, s], self.E_z[s, s, s],
+                      length=step, normalize=True, color='gray')
             plt.show()
         else:
-            plt.plot(self.E_x, self.E_y)
-            plt.show()
\ No newline at end of file
+            # rows of V_2d (the x-axis of the field) are drawn vertically, as in plot_potential_surface
+            s = slice(None, None, step)
+            j, i = np.meshgrid(np.arange(0, self.dim, step), np.arange(0, self.dim, step))
+            plt.streamplot(j, i, self.E_y[s, s], self.E_x[s, s])
+            plt.show()
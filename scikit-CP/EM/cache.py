@@ -0,0 +1,176 @@
+#   File name: cache.py
+#   Author: Nawaf Abdullah
+#   Creation Date: 17/October/2026
+#   Description: Cache of solved potential grids keyed by their electrode geometry
+import numpy as np
+import os
+import hashlib
+from collections import OrderedDict
+from EM.relaxation import walls
+
+
+def geometry_key(fixed):
+    """
+    Hash of the shape and the fixed nodes of a grid, identifies grids sharing the same matrix
+    :param fixed: boolean array marking the nodes held at a fixed potential
+    :return: hexadecimal string
+    """
+    digest = hashlib.sha1(str(fixed.shape).encode())
+    digest.update(np.packbits(fixed).tobytes())
+    return digest.hexdigest()
+
+
+def solution_key(fixed, V, rhs=None):
+    """
+    Hash of a whole problem: its geometry, the potentials of its fixed nodes and of the walls of the grid (fixed
+    for every solver) and its charge density
+    :param fixed: boolean array marking the nodes held at a fixed potential
+    :param V: potential array holding the fixed potentials
+    :param rhs: source term, None for Laplace
+    :return: hexadecimal string
+    """
+    digest = hashlib.sha1(geometry_key(fixed).encode())
+    digest.update(np.ascontiguousarray(V[fixed | walls(V.shape)], dtype=np.float64).tobytes())
+    if rhs is not None:
+        digest.update(np.ascontiguousarray(rhs, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+def interpolate(V, shape):
+    """
+    Multilinear interpolation of a grid onto a grid of another size covering the same space
+    :param V: 2D or 3D array
+    :param shape: shape of the new grid
+    :return: array of the given shape
+    """
+    V = np.asarray(V, dtype=np.float64)
+    for axis, n in enumerate(shape):
+        m = V.shape[axis]
+        if n == m:
+            continue
+        # position of every new node on the old grid, the first and last nodes coincide
+        position = np.linspace(0, m - 1, n)
+        below = np.minimum(position.astype(int), max(m - 2, 0))
+        above = np.minimum(below + 1, m - 1)
+        weight = (position - below).reshape((-1,) + (1,) * (V.ndim - axis - 1))
+        V = V.take(below, axis=axis) * (1 - weight) + V.take(above, axis=axis) * weight
+    return V
+
+
+class SolutionCache:
+    def __init__(self, max_entries=16, directory=None):
+        """
+        Least recently used cache of solved potential grids.
+            - Every solution is stored under the hash of its whole problem (see solution_key), and the latest
+              solution of every geometry is also reachable from the hash of the geometry alone, to warm start
+              problems that only differ by their voltages or charges
+            - Every solution keeps the tolerance it converged to and the norm of that tolerance (0 for a direct
+              solve), and only counts as a solution of a new request at least as loose in a norm it bounds.
+              Otherwise it is a warm start. The relative residuals of conjugate gradients ("cg_rel") only bound
+              other conjugate gradients requests
+            - With a directory, the solutions are kept as .npz files that outlive the process
+        :param max_entries: number of solutions kept, the least recently used ones are evicted first
+        :param directory: directory of the on-disk cache, None to keep the solutions in memory
+        """
+        self.max_entries = max_entries
+        self.directory = directory
+        self.__entries = OrderedDict()
+        self.__geometries = {}
+        self.__tolerances = {}
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            files = [name for name in os.listdir(directory) if name.endswith(".npz")]
+            files.sort(key=lambda name: os.path.getmtime(os.path.join(directory, name)))
+            for name in files:
+                key = name[:-4]
+                with np.load(os.path.join(directory, name)) as data:
+                    self.__geometries[str(data["geometry"])] = key
+                    # files written without a tolerance are only good for warm starts
+                    if "tol" in data:
+                        self.__tolerances[key] = (float(data["tol"]), str(data["norm"]))
+                    else:
+                        self.__tolerances[key] = (np.inf, "max")
+                self.__entries[key] = None
+            self.__evict()
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def __path(self, key):
+        return os.path.join(self.directory, key + ".npz")
+
+    def __load(self, key):
+        V = self.__entries[key]
+        if V is None:
+            with np.load(self.__path(key)) as data:
+                V = data["V"]
+        self.__entries.move_to_end(key)
+        return V
+
+    def __evict(self):
+        while len(self.__entries) > self.max_entries:
+            key, V = self.__entries.popitem(last=False)
+            self.__tolerances.pop(key, None)
+            if self.directory is not None and os.path.exists(self.__path(key)):
+                os.remove(self.__path(key))
+            for geometry in [g for g, k in self.__geometries.items() if k == key]:
+                del self.__geometries[geometry]
+
+    def put(self, fixed, V, rhs=None, tol=0.0, norm="max"):
+        """
+        Stores a solved potential grid
+        :param fixed: boolean array marking the nodes held at a fixed potential
+        :param V: solved potential array
+        :param rhs: source term the grid was solved with, None for Laplace
+        :param tol: tolerance the grid converged to, 0 for an exact (direct) solution
+        :param norm: norm of the tolerance, "max", "l2" or "cg_rel" (relative residual of conjugate gradients)
+        """
+        key = solution_key(fixed, V, rhs)
+        geometry = geometry_key(fixed)
+        self.__geometries[geometry] = key
+        self.__tolerances[key] = (tol, norm)
+        if self.directory is None:
+            self.__entries[key] = np.array(V)
+        else:
+            np.savez(self.__path(key), V=np.asarray(V), geometry=np.array(geometry), tol=np.array(tol),
+                     norm=np.array(norm))
+            self.__entries[key] = None
+        self.__entries.move_to_end(key)
+        self.__evict()
+
+    def lookup(self, fixed, V, rhs=None, tol=0.0, norm="max"):
+        """
+        Finds a solution for a problem
+        :param fixed: boolean array marking the nodes held at a fixed potential
+        :param V: potential array holding the fixed potentials
+        :param rhs: source term, None for Laplace
+        :param tol: tolerance requested, 0 for an exact (direct) solution
+        :param norm: norm of the tolerance, "max", "l2" or "cg_rel"
+        :return: (solution, True) when this problem was solved at least as tightly, (solution, False) for the
+                 latest solution of the same geometry or a looser solution of this problem, (None, False) when
+                 the geometry was never solved
+        """
+        key = solution_key(fixed, V, rhs)
+        if key in self.__entries:
+            achieved, achieved_norm = self.__tolerances.get(key, (np.inf, "max"))
+            # the root mean square never exceeds the max norm, a max norm tolerance covers both
+            if achieved <= tol and (achieved == 0 or achieved_norm == norm or
+                                    (achieved_norm == "max" and norm == "l2")):
+                return self.__load(key), True
+            return self.__load(key), False
+        key = self.__geometries.get(geometry_key(fixed))
+        if key is not None:
+            return self.__load(key), False
+        return None, False
+
+    def clear(self):
+        """
+        Removes every solution, and their files
+        """
+        if self.directory is not None:
+            for key in self.__entries:
+                if os.path.exists(self.__path(key)):
+                    os.remove(self.__path(key))
+        self.__entries.clear()
+        self.__geometries.clear()
+        self.__tolerances.clear()
@@ -0,0 +1,147 @@
+#   File name: fieldlines.py
+#   Author: Nawaf Abdullah
+#   Creation Date: 17/October/2026
+#   Description: Batched field line tracing and equipotential contour extraction on solved grids
+import numpy as np
+from itertools import product
+
+
+def interpolate_field(E, points):
+    """
+    Multilinear (bilinear in 2D, trilinear in 3D) interpolation of a vector field at many points at once
+    :param E: field components stacked in an array of shape (num_components, n, n[, n])
+    :param points: array of shape (num_points, ndim) of positions in grid index units
+    :return: array of shape (num_points, num_components)
+    """
+    ndim = E.ndim - 1
+    shape = np.array(E.shape[1:])
+    base = np.clip(np.floor(points).astype(int), 0, shape - 2)
+    t = points - base
+    value = np.zeros((E.shape[0], len(points)), dtype=np.float64)
+    for corner in product((0, 1), repeat=ndim):
+        corner = np.array(corner)
+        weight = np.prod(np.where(corner == 1, t, 1 - t), axis=1)
+        index = tuple((base + corner).T)
+        value += E[(slice(None),) + index] * weight
+    return value.T
+
+
+def trace_field_lines(E, seeds, step=0.5, max_steps=1000, stop=None, direction=1):
+    """
+    Traces the field lines through many seed points at once with 4th order Runge-Kutta steps of fixed length.
+        - A line ends when it leaves the grid, reaches a node marked in stop (e.g. an electrode),
+          or reaches a point where the field vanishes
+    :param E: field components stacked in an array of shape (ndim, n, n[, n])
+    :param seeds: array of shape (num_seeds, ndim) of starting positions in grid index units
+    :param step: length of a step along the line, in grid steps
+    :param max_steps: largest number of steps of a line
+    :param stop: boolean array the shape of the grid marking the nodes where lines end, None for none
+    :param direction: 1 to follow the field, -1 to go against it
+    :return: lines as an array of shape (num_seeds, max_steps + 1, ndim), padded with NaN after the end of
+             every line, and the number of points of every line
+    """
+    seeds = np.asarray(seeds, dtype=np.float64)
+    num_seeds, ndim = seeds.shape
+    upper = np.array(E.shape[1:]) - 1
+    lines = np.full((num_seeds, max_steps + 1, ndim), np.nan)
+    lines[:, 0] = seeds
+    lengths = np.ones(num_seeds, dtype=int)
+    active = np.flatnonzero(np.all((seeds >= 0) & (seeds <= upper), axis=1))
+    p = seeds[active]
+
+    def direction_of(points):
+        field = interpolate_field(E, np.clip(points, 0, upper)) * direction
+        norm = np.linalg.norm(field, axis=1)
+        return field / np.where(norm > 0, norm, 1)[:, None], norm
+
+    for n in range(1, max_steps + 1):
+        if active.size == 0:
+            break
+        k1, norm = direction_of(p)
+        k2 = direction_of(p + 0.5 * step * k1)[0]
+        k3 = direction_of(p + 0.5 * step * k2)[0]
+        k4 = direction_of(p + step * k3)[0]
+        p = p + (step / 6) * (k1 + 2 * k2 + 2 * k3 + k4)
+        alive = (norm > 0) & np.all((p >= 0) & (p <= upper), axis=1)
+        if stop is not None:
+            nearest = tuple(np.clip(np.rint(p).astype(int), 0, upper).T)
+            reached = stop[nearest]
+            # the point on the electrode is kept as the end of the line
+            lines[active[reached & alive], n] = p[reached & alive]
+            lengths[active[reached & alive]] += 1
+            alive &= ~reached
+        lines[active[alive], n] = p[alive]
+        lengths[active[alive]] += 1
+        active = active[alive]
+        p = p[alive]
+    return lines, lengths
+
+
+def electrode_seeds(fixed, V, every=1):
+    """
+    Free nodes next to a conductor at a higher potential than theirs, where field lines leave the conductors
+    :param fixed: boolean array marking the conductor nodes
+    :param V: solved potential array
+    :param every: keeps every n-th seed only
+    :return: array of shape (num_seeds, ndim) of node positions
+    """
+    seeds = np.zeros(fixed.shape, dtype=bool)
+    inner = tuple(slice(1, -1) for n in fixed.shape)
+    for axis in range(fixed.ndim):
+        for shift in (-1, 1):
+            index = list(inner)
+            index[axis] = slice(1 + shift, fixed.shape[axis] - 1 + shift)
+            index = tuple(index)
+            seeds[inner] |= fixed[index] & (V[index] > V[inner])
+    seeds &= ~fixed
+    return np.argwhere(seeds)[::every].astype(np.float64)
+
+
+def equipotentials(V, levels):
+    """
+    Extracts contour lines of a 2D grid with a vectorized marching squares
+    :param V: 2D array
+    :param levels: list of potential values
+    :return: list with, for every level, an array of shape (num_segments, 2, 2) of line segments
+             ((i0, j0), (i1, j1)) in grid index units
+    """
+    V = np.asarray(V, dtype=np.float64)
+    i, j = np.mgrid[0:V.shape[0] - 1, 0:V.shape[1] - 1]
+    a, b, c, d = V[:-1, :-1], V[:-1, 1:], V[1:, 1:], V[1:, :-1]
+    contours = []
+    for level in levels:
+        above = [a >= level, b >= level, c >= level, d >= level]
+        # edges of the cells: a-b (top), b-c (right), c-d (bottom), d-a (left)
+        corners = [(a, b), (b, c), (c, d), (d, a)]
+        crossed = np.stack([above[e] != above[(e + 1) % 4] for e in range(4)])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = [(level - v0) / (v1 - v0) for v0, v1 in corners]
+        points = np.stack([
+            np.stack([i, j + t[0]], axis=-1),
+            np.stack([i + t[1], j + 1], axis=-1),
+            np.stack([i + 1, j + 1 - t[2]], axis=-1),
+            np.stack([i + 1 - t[3], j], axis=-1),
+        ])
+        count = crossed.sum(axis=0)
+
+        # cells crossed twice: one segment between the two crossed edges
+        two = count == 2
+        first = np.argmax(crossed[:, two], axis=0)
+        second = 3 - np.argmax(crossed[::-1, two], axis=0)
+        cells = points[:, two]
+        rows = np.arange(cells.shape[1])
+        segments = [np.stack([cells[first, rows], cells[second, rows]], axis=1)]
+
+        # saddle cells crossed on all four edges: the value at the centre picks the pairing of the edges
+        four = count == 4
+        centre_above = (a + b + c + d)[four] / 4 >= level
+        joined = centre_above == above[0][four]
+        cells = points[:, four]
+        pairs_joined = [(0, 1), (2, 3)]
+        pairs_split = [(3, 0), (1, 2)]
+        for (e0, e1), (f0, f1) in zip(pairs_joined, pairs_split):
+            start = np.where(joined[:, None], cells[e0], cells[f0])
+            end = np.where(joined[:, None], cells[e1], cells[f1])
+            segments.append(np.stack([start, end], axis=1))
+        contours.append(np.concatenate(segments))
+    return contours
@@ -0,0 +1,249 @@
+#   File name: multigrid.py
+#   Author: Nawaf Abdullah
+#   Creation Date: 17/October/2026
+#   Description: Geometric multigrid solver of the Laplace and Poisson equations on 2D and 3D grids
+import numpy as np
+from EM.relaxation import red_black_sweep, update_norm, interior, walls
+
+
+def _padded_size(n):
+    """
+    Smallest grid side of the form 2^k + 1 that holds n nodes
+    :param n: number of nodes along one side
+    """
+    size = 3
+    while size < n:
+        size = 2 * size - 1
+    return size
+
+
+def residual(V, fixed, rhs=None):
+    """
+    Calculates the residual of the discrete Poisson equation, scaled by the squared grid step
+    :param V: 2D or 3D potential array
+    :param fixed: boolean array marking the nodes held at a fixed potential
+    :param rhs: source term scaled by the squared grid step, None for Laplace
+    :return: residual array the shape of V, zero on the fixed nodes and the walls
+    """
+    r = np.zeros_like(V)
+    inner = interior(V.ndim)
+    r_inner = r[inner]
+    for axis in range(V.ndim):
+        np.add(r_inner, V[interior(V.ndim, axis, 1)], out=r_inner)
+        np.add(r_inner, V[interior(V.ndim, axis, -1)], out=r_inner)
+    r_inner -= (2 * V.ndim) * V[inner]
+    if rhs is not None:
+        r_inner += rhs[inner]
+    np.copyto(r, 0, where=fixed)
+    return r
+
+
+def restrict(r):
+    """
+    Full weighting restriction of a grid with 2^k + 1 nodes per side onto every other node
+    :param r: fine 2D or 3D array
+    :return: coarse array with (n + 1) / 2 nodes per side, zero on the walls
+    """
+    for axis in range(r.ndim):
+        fine = np.moveaxis(r, axis, 0)
+        coarse = np.zeros((fine.shape[0] // 2 + 1,) + fine.shape[1:], dtype=r.dtype)
+        coarse[1:-1] = 0.5 * fine[2:-1:2] + 0.25 * (fine[1:-2:2] + fine[3::2])
+        r = np.moveaxis(coarse, 0, axis)
+    return r
+
+
+def prolong(e, shape):
+    """
+    Multilinear interpolation of a coarse grid onto the grid twice as fine
+    :param e: coarse 2D or 3D array
+    :param shape: shape of the fine grid
+    :return: fine array
+    """
+    for axis in range(e.ndim):
+        coarse = np.moveaxis(e, axis, 0)
+        fine = np.empty((shape[axis],) + coarse.shape[1:], dtype=e.dtype)
+        fine[::2] = coarse
+        fine[1::2] = 0.5 * (coarse[:-1] + coarse[1:])
+        e = np.moveaxis(fine, 0, axis)
+    return e
+
+
+def _coarsen_axis(fixed, total=None, count=None):
+    """
+    Coarsens a fixed node mask along the first axis. A coarse node is fixed when its fine node is, or when it
+    touches a thin fixed node: one lying between two coarse nodes with free nodes on both sides.
+        - Thin electrodes would otherwise vanish from the coarse grid, while walls and thick electrodes only
+          move by one fine node at most instead of growing on every coarser grid
+    :param fixed: boolean array with 2^k + 1 nodes along the first axis
+    :param total: sums of the potentials of the fixed nodes, coarsened alongside the mask if given
+    :param count: numbers of fixed nodes summed in total
+    :return: coarse mask, and coarse total and count
+    """
+    thin = fixed[1::2] & ~fixed[:-1:2] & ~fixed[2::2]
+    coarse = fixed[::2].copy()
+    coarse[1:] |= thin
+    coarse[:-1] |= thin
+    if total is None:
+        return coarse, None, None
+    total_c, count_c = total[::2].copy(), count[::2].copy()
+    for fine, summed in ((total, total_c), (count, count_c)):
+        between = np.where(thin, fine[1::2], 0)
+        summed[1:] += between
+        summed[:-1] += between
+    return coarse, total_c, count_c
+
+
+def coarsen_fixed(fixed):
+    """
+    Marks the coarse nodes held at zero error, see _coarsen_axis
+    :param fixed: fine boolean array with 2^k + 1 nodes per side
+    :return: coarse boolean array
+    """
+    for axis in range(fixed.ndim):
+        coarse = _coarsen_axis(np.moveaxis(fixed, axis, 0))[0]
+        fixed = np.moveaxis(coarse, 0, axis)
+    return np.ascontiguousarray(fixed)
+
+
+def coarsen_potential(V, fixed):
+    """
+    Coarse grid problem of a full multigrid solve: the coarse nodes fixed by coarsen_fixed are held at the
+    average potential of the fixed fine nodes they stand for, the others start from the fine potential
+    :param V: fine 2D or 3D potential array with 2^k + 1 nodes per side
+    :param fixed: fine boolean array marking the nodes held at a fixed potential
+    :return: coarse potential array and coarse boolean array of its fixed nodes
+    """
+    total = np.where(fixed, V, 0)
+    count = fixed.astype(V.dtype)
+    for axis in range(V.ndim):
+        coarse = _coarsen_axis(*(np.moveaxis(a, axis, 0) for a in (fixed, total, count)))
+        fixed, total, count = (np.moveaxis(a, 0, axis) for a in coarse)
+    fixed = np.ascontiguousarray(fixed)
+    V_c = V[(slice(None, None, 2),) * V.ndim].copy()
+    np.divide(total, count, out=V_c, where=fixed)
+    return V_c, fixed
+
+
+def hierarchy(fixed):
+    """
+    Builds the fixed node masks of every grid of a V-cycle, from the finest to a coarsest grid of 5 nodes per side
+    :param fixed: boolean array with 2^k + 1 nodes per side, walls included
+    :return: list of boolean arrays
+    """
+    levels = [fixed]
+    while min(levels[-1].shape) > 5:
+        levels.append(coarsen_fixed(levels[-1]))
+    return levels
+
+
+def v_cycle(V, levels, rhs=None, pre=1, post=1):
+    """
+    One multigrid V-cycle: smoothing, coarse grid correction of the error and smoothing again.
+        - The cycle is symmetric, so it can also precondition conjugate gradients
+    :param V: potential array with 2^k + 1 nodes per side, updated in place
+    :param levels: fixed node masks of the grids of the cycle, see hierarchy()
+    :param rhs: source term scaled by the squared grid step, None for Laplace
+    :param pre: number of red-black sweeps before the correction
+    :param post: number of black-red sweeps after the correction
+    :return: V
+    """
+    fixed = levels[0]
+    if len(levels) == 1:
+        # coarsest grid, a handful of nodes: relax it to convergence
+        for n in range(100):
+            if red_black_sweep(V, fixed, 1.0, rhs)[0] < 1e-14 * (1 + np.abs(V).max()):
+                break
+        return V
+    for n in range(pre):
+        red_black_sweep(V, fixed, 1.0, rhs, measure=False)
+    # the error solves the same equation with the residual as source and zero error on the fixed nodes;
+    # the source scales with the squared grid step, which doubles on the coarse grid
+    r_c = 4 * restrict(residual(V, fixed, rhs))
+    e_c = v_cycle(np.zeros_like(r_c), levels[1:], r_c, pre, post)
+    e = prolong(e_c, V.shape)
+    np.copyto(e, 0, where=fixed)
+    V += e
+    for n in range(post):
+        red_black_sweep(V, fixed, 1.0, rhs, colors=(1, 0), measure=False)
+    return V
+
+
+def full_multigrid(V, fixed, rhs=None, pre=1, post=1):
+    """
+    Full multigrid initial solve: the problem is solved on the coarsest grid first and interpolated
+    up one grid at a time, with a V-cycle on every grid
+    :param V: potential array with 2^k + 1 nodes per side and the fixed potentials set, updated in place
+    :param fixed: boolean array marking the nodes held at a fixed potential, walls included
+    :param rhs: source term scaled by the squared grid step, None for Laplace
+    :param pre: number of red-black sweeps before the correction of every V-cycle
+    :param post: number of black-red sweeps after the correction of every V-cycle
+    :return: V
+    """
+    if min(V.shape) > 5:
+        # thin electrodes between coarse nodes are moved onto the nearest ones rather than dropped
+        V_c, fixed_c = coarsen_potential(V, fixed)
+        rhs_c = None if rhs is None else 4 * rhs[(slice(None, None, 2),) * V.ndim]
+        V_c = full_multigrid(V_c, fixed_c, rhs_c, pre, post)
+        np.copyto(V, prolong(V_c, V.shape), where=~fixed)
+    return v_cycle(V, hierarchy(fixed), rhs, pre, post)
+
+
+def solve(V, fixed, num_cycles, tol=None, norm="max", rhs=None, full=False, pre=2, post=2):
+    """
+    Solves the Laplace (or Poisson) equation with conjugate gradients preconditioned by a multigrid V-cycle.
+        - The grid is padded with fixed nodes up to 2^k + 1 nodes per side, the walls of V stay fixed
+    :param V: 2D or 3D potential array holding the fixed potentials and the initial guess, updated in place
+    :param fixed: boolean array marking the nodes held at a fixed potential
+    :param num_cycles: largest number of V-cycles
+    :param tol: stops once the norm of the update of a cycle falls below tol, None to run num_cycles cycles
+    :param norm: "max" or "l2"
+    :param rhs: source term scaled by the squared grid step, None for Laplace
+    :param full: start from a full multigrid solve instead of the guess held in V
+    :param pre: number of red-black sweeps before the correction of every V-cycle
+    :param post: number of black-red sweeps after the correction of every V-cycle
+    :return: V and the norm of the update of every cycle
+    """
+    shape = tuple(_padded_size(n) for n in V.shape)
+    grid = tuple(slice(0, n) for n in V.shape)
+    V_p = np.zeros(shape, dtype=V.dtype)
+    V_p[grid] = V
+    fixed_p = np.ones(shape, dtype=bool)
+    fixed_p[grid] = fixed
+    fixed_p[grid] |= walls(V.shape)
+    rhs_p = None
+    if rhs is not None:
+        rhs_p = np.zeros(shape, dtype=V.dtype)
+        rhs_p[grid] = rhs
+    history = []
+    if full and num_cycles > 0:
+        V_old = V_p[grid].copy()
+        full_multigrid(V_p, fixed_p, rhs_p, pre, post)
+        delta = V_p[grid] - V_old
+        history.append(update_norm(np.abs(delta).max(), float(np.vdot(delta, delta)), V.size, norm))
+
+    levels = hierarchy(fixed_p)
+    r = residual(V_p, fixed_p, rhs_p)
+    z = v_cycle(np.zeros_like(r), levels, r, pre, post)
+    p = z.copy()
+    rz = np.vdot(r, z)
+    for n in range(len(history), num_cycles):
+        if tol is not None and history and history[-1] < tol:
+            break
+        if rz == 0:
+            history.append(0.0)
+            break
+        # the Laplacian restricted to the free nodes, applied to the search direction
+        Ap = residual(p, fixed_p)
+        Ap *= -1
+        alpha = rz / np.vdot(p, Ap)
+        delta = alpha * p[grid]
+        V_p += alpha * p
+        r -= alpha * Ap
+        history.append(update_norm(np.abs(delta).max(), float(np.vdot(delta, delta)), V.size, norm))
+        z = v_cycle(np.zeros_like(r), levels, r, pre, post)
+        rz_new = np.vdot(r, z)
+        p *= rz_new / rz
+        p += z
+        rz = rz_new
+    V[...] = V_p[grid]
+    return V, np.array(history)
@@ -0,0 +1,109 @@
+#   File name: parallel.py
+#   Author: Nawaf Abdullah
+#   Creation Date: 17/October/2026
+#   Description: Red-black relaxation of a potential grid split into slabs relaxed by a pool of processes
+import numpy as np
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+from EM.relaxation import half_sweep, slabs
+
+# Grids of the worker process, attached to the shared memory blocks of the parent
+_shared = {}
+
+
+def _attach(specs):
+    """
+    Pool initializer: maps the shared memory blocks of the parent onto numpy arrays
+    :param specs: dictionary of name: (shared memory name, shape, dtype)
+    """
+    for name, (shm_name, shape, dtype) in specs.items():
+        shm = SharedMemory(name=shm_name)
+        _shared[name] = (shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf))
+
+
+def _relax_slab(job):
+    """
+    Relaxes the nodes of one color inside one slab of planes, in place in shared memory
+    :param job: (start, stop, color, omega) of the slab
+    :return: largest absolute update and sum of the squared updates
+    """
+    start, stop, color, omega = job
+    block = (slice(start - 1, stop + 1),)
+    V = _shared["V"][1][block]
+    fixed = _shared["fixed"][1][block]
+    rhs = _shared["rhs"][1][block] if "rhs" in _shared else None
+    # the block is a view starting at plane start - 1, which shifts the parity of its nodes
+    return half_sweep(V, fixed, (color + start - 1) % 2, omega, rhs)
+
+
+class SlabRelaxation:
+    def __init__(self, V, fixed, rhs=None, workers=2):
+        """
+        Red-black relaxation of a grid split along its first axis into one slab of planes per worker.
+            - The grids are copied into shared memory, so every worker reads the planes bordering its slab
+              (the halo) straight from its neighbours. A half sweep only reads nodes of the other color, so
+              the slabs are relaxed concurrently and the result is the same as the serial red_black_sweep
+            - Use as a context manager, or call close() to stop the workers and free the shared memory
+        :param V: 2D or 3D potential array holding the fixed potentials and the initial guess
+        :param fixed: boolean array marking the nodes held at a fixed potential
+        :param rhs: source term scaled by the squared grid step, None for Laplace
+        :param workers: number of worker processes
+        """
+        self.shape = V.shape
+        self.__memory = {}
+        self.__arrays = {}
+        specs = {}
+        arrays = {"V": V, "fixed": fixed}
+        if rhs is not None:
+            arrays["rhs"] = rhs
+        for name, array in arrays.items():
+            shm = SharedMemory(create=True, size=max(1, array.nbytes))
+            shared = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)
+            shared[...] = array
+            self.__memory[name] = shm
+            self.__arrays[name] = shared
+            specs[name] = (shm.name, array.shape, array.dtype)
+        size = -(-(self.shape[0] - 2) // workers)
+        self.slabs = slabs(self.shape[0], max(1, size))
+        self.__pool = Pool(min(workers, len(self.slabs)), initializer=_attach, initargs=(specs,))
+
+    @property
+    def V(self):
+        """
+        The potential grid in shared memory
+        """
+        return self.__arrays["V"]
+
+    def sweep(self, omega=1.0):
+        """
+        One red-black sweep over every slab
+        :param omega: over-relaxation factor, 1 for plain Gauss-Seidel, between 1 and 2 for SOR
+        :return: largest absolute update and sum of the squared updates of the sweep
+        """
+        max_update = 0.0
+        sum_sq = 0.0
+        for color in (0, 1):
+            jobs = [(start, stop, color, omega) for start, stop in self.slabs]
+            # map returns once every slab is done: the barrier between the two colors
+            for slab_max, slab_sum in self.__pool.map(_relax_slab, jobs):
+                max_update = max(max_update, slab_max)
+                sum_sq += slab_sum
+        return max_update, sum_sq
+
+    def close(self):
+        """
+        Stops the workers and frees the shared memory. Views of self.V must be released first
+        """
+        self.__pool.close()
+        self.__pool.join()
+        self.__arrays = {}
+        for shm in self.__memory.values():
+            shm.close()
+            shm.unlink()
+        self.__memory = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
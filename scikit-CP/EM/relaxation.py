@@ -0,0 +1,254 @@
+#   File name: relaxation.py
+#   Author: Nawaf Abdullah
+#   Creation Date: 17/October/2026
+#   Description: Vectorized relaxation sweeps for Laplace's equation on 2D and 3D grids
+import numpy as np
+from itertools import product
+
+
+def interior(ndim, offset_axis=None, offset=0):
+    """
+    Builds the slice tuple of the grid interior, optionally shifted by one node along an axis
+    :param ndim: number of grid dimensions
+    :param offset_axis: axis along which the interior is shifted
+    :param offset: shift of the interior along offset_axis (-1, 0 or 1)
+    :return: tuple of slices
+    """
+    index = []
+    for axis in range(ndim):
+        if axis == offset_axis:
+            index.append(slice(1 + offset, -1 + offset if offset < 1 else None))
+        else:
+            index.append(slice(1, -1))
+    return tuple(index)
+
+
+def walls(shape):
+    """
+    Boolean array marking the outermost layer of nodes of a grid, held at their potentials by every solver
+    :param shape: shape of the grid
+    """
+    outer = np.ones(shape, dtype=bool)
+    outer[interior(len(shape))] = False
+    return outer
+
+
+def neighbour_average(V):
+    """
+    Calculates the average of the 2*ndim nearest neighbours of every interior node
+    :param V: 2D or 3D potential array
+    :return: array the shape of the interior of V
+    """
+    total = np.zeros(tuple(n - 2 for n in V.shape), dtype=V.dtype)
+    for axis in range(V.ndim):
+        total += V[interior(V.ndim, axis, 1)]
+        total += V[interior(V.ndim, axis, -1)]
+    return total * (1 / (2 * V.ndim))
+
+
+def jacobi_sweep(V, fixed, omega=1.0, rhs=None):
+    """
+    Relaxes every free interior node at once from the values of the previous sweep
+    :param V: 2D or 3D potential array, updated in place
+    :param fixed: boolean array the shape of V marking the nodes held at a fixed potential
+    :param omega: relaxation factor, 1 for plain Jacobi
+    :param rhs: source term of the Poisson equation scaled by the squared grid step, None for Laplace
+    :return: largest absolute update and sum of the squared updates of the sweep
+    """
+    inner = interior(V.ndim)
+    delta = neighbour_average(V) - V[inner]
+    if rhs is not None:
+        delta += rhs[inner] * (1 / (2 * V.ndim))
+    delta[fixed[inner]] = 0
+    if omega != 1:
+        delta *= omega
+    V[inner] += delta
+    return np.abs(delta).max(initial=0), float(np.vdot(delta, delta))
+
+
+def _sublattices(shape, color):
+    """
+    Yields the strided slices of the interior nodes whose index sum has the given parity
+    :param shape: shape of the grid
+    :param color: 0 for the red nodes, 1 for the black nodes
+    """
+    ndim = len(shape)
+    for parity in product((0, 1), repeat=ndim):
+        if sum(parity) % 2 != color:
+            continue
+        # nodes (1 + p, 3 + p, ...) along every axis, and the same lattice shifted by +-1 node
+        centre = tuple(slice(1 + p, n - 1, 2) for p, n in zip(parity, shape))
+        neighbours = []
+        for axis in range(ndim):
+            for step in (-1, 1):
+                index = list(centre)
+                p, n = parity[axis], shape[axis]
+                index[axis] = slice(1 + p + step, n - 1 + step, 2)
+                neighbours.append(tuple(index))
+        yield centre, neighbours
+
+
+def half_sweep(V, fixed, color, omega=1.0, rhs=None, measure=True):
+    """
+    Relaxes the free interior nodes of one color, whose neighbours are all of the other color
+    :param V: 2D or 3D potential array, updated in place
+    :param fixed: boolean array the shape of V marking the nodes held at a fixed potential
+    :param color: 0 for the red nodes (even index sum), 1 for the black nodes
+    :param omega: over-relaxation factor
+    :param rhs: source term of the Poisson equation scaled by the squared grid step, None for Laplace
+    :param measure: calculates the size of the update, zeros are returned when False
+    :return: largest absolute update and sum of the squared updates
+    """
+    max_update = 0.0
+    sum_sq = 0.0
+    for centre, neighbours in _sublattices(V.shape, color):
+        delta = np.add(V[neighbours[0]], V[neighbours[1]])
+        for index in neighbours[2:]:
+            np.add(delta, V[index], out=delta)
+        if rhs is not None:
+            np.add(delta, rhs[centre], out=delta)
+        delta *= 1 / (2 * V.ndim)
+        delta -= V[centre]
+        np.copyto(delta, 0, where=fixed[centre])
+        if omega != 1:
+            delta *= omega
+        V[centre] += delta
+        if measure:
+            max_update = max(max_update, np.abs(delta).max(initial=0))
+            sum_sq += float(np.vdot(delta, delta))
+    return max_update, sum_sq
+
+
+def red_black_sweep(V, fixed, omega=1.0, rhs=None, colors=(0, 1), measure=True):
+    """
+    Relaxes the free interior nodes in two half sweeps (red then black nodes) of Gauss-Seidel
+    :param V: 2D or 3D potential array, updated in place
+    :param fixed: boolean array the shape of V marking the nodes held at a fixed potential
+    :param omega: over-relaxation factor, 1 for plain Gauss-Seidel, between 1 and 2 for SOR
+    :param rhs: source term of the Poisson equation scaled by the squared grid step, None for Laplace
+    :param colors: order of the half sweeps, (1, 0) relaxes the black nodes first
+    :param measure: calculates the size of the update, zeros are returned when False
+    :return: largest absolute update and sum of the squared updates of the sweep
+    """
+    max_update = 0.0
+    sum_sq = 0.0
+    for color in colors:
+        half_max, half_sum = half_sweep(V, fixed, color, omega, rhs, measure)
+        max_update = max(max_update, half_max)
+        sum_sq += half_sum
+    return max_update, sum_sq
+
+
+def slabs(n, size):
+    """
+    Splits the interior planes 1 ... n - 2 along the first axis into slabs
+    :param n: number of planes
+    :param size: number of planes per slab
+    :return: list of (start, stop) plane ranges
+    """
+    return [(start, min(start + size, n - 1)) for start in range(1, n - 1, size)]
+
+
+def _block(array, start, stop):
+    """
+    Loads the planes of a slab and the plane on either side of it into memory
+    """
+    if array is None:
+        return None
+    return np.array(array[start - 1:stop + 1])
+
+
+def jacobi_sweep_slabs(V, fixed, omega=1.0, rhs=None, slab=16):
+    """
+    Jacobi sweep done one slab of planes at a time, for grids too large for memory (e.g. numpy.memmap).
+        - Gives the same result as jacobi_sweep
+    :param V: 3D potential array, updated in place
+    :param fixed: boolean array the shape of V marking the nodes held at a fixed potential
+    :param omega: relaxation factor, 1 for plain Jacobi
+    :param rhs: source term of the Poisson equation scaled by the squared grid step, None for Laplace
+    :param slab: number of planes held in memory at once
+    :return: largest absolute update and sum of the squared updates of the sweep
+    """
+    max_update = 0.0
+    sum_sq = 0.0
+    previous = np.array(V[0])
+    for start, stop in slabs(V.shape[0], slab):
+        block = _block(V, start, stop)
+        # the plane before the slab was already relaxed with the previous slab: use its old values
+        block[0] = previous
+        previous = block[-2].copy()
+        slab_max, slab_sum = jacobi_sweep(block, _block(fixed, start, stop), omega, _block(rhs, start, stop))
+        V[start:stop] = block[1:-1]
+        max_update = max(max_update, slab_max)
+        sum_sq += slab_sum
+    return max_update, sum_sq
+
+
+def red_black_sweep_slabs(V, fixed, omega=1.0, rhs=None, slab=16):
+    """
+    Red-black sweep done one slab of planes at a time, for grids too large for memory (e.g. numpy.memmap).
+        - Gives the same result as red_black_sweep: a half sweep only reads nodes of the other color,
+          so the slabs can be relaxed one after the other in place
+    :param V: 3D potential array, updated in place
+    :param fixed: boolean array the shape of V marking the nodes held at a fixed potential
+    :param omega: over-relaxation factor, 1 for plain Gauss-Seidel, between 1 and 2 for SOR
+    :param rhs: source term of the Poisson equation scaled by the squared grid step, None for Laplace
+    :param slab: number of planes held in memory at once
+    :return: largest absolute update and sum of the squared updates of the sweep
+    """
+    max_update = 0.0
+    sum_sq = 0.0
+    for color in (0, 1):
+        for start, stop in slabs(V.shape[0], slab):
+            block = _block(V, start, stop)
+            # the block starts at plane start - 1, which shifts the parity of its nodes
+            slab_max, slab_sum = half_sweep(block, _block(fixed, start, stop), (color + start - 1) % 2, omega,
+                                            _block(rhs, start, stop))
+            V[start:stop] = block[1:-1]
+            max_update = max(max_update, slab_max)
+            sum_sq += slab_sum
+    return max_update, sum_sq
+
+
+def optimal_omega(shape):
+    """
+    Over-relaxation factor of SOR that is optimal for Laplace's equation on a box with fixed walls
+    :param shape: shape of the grid
+    :return: omega, between 1 and 2
+    """
+    n = max(shape) - 1
+    if n < 2:
+        return 1.0
+    # spectral radius of the Jacobi iteration on the largest side of the box
+    rho = np.cos(np.pi / n)
+    return 2 / (1 + np.sqrt(1 - rho ** 2))
+
+
+def update_norm(max_update, sum_sq, size, norm):
+    """
+    Reduces the statistics returned by a sweep to the norm used for the convergence test
+    :param max_update: largest absolute update of the sweep
+    :param sum_sq: sum of the squared updates of the sweep
+    :param size: number of nodes in the grid
+    :param norm: "max" for the largest update, "l2" for the root mean square update
+    :return: the norm of the update
+    """
+    if norm == "max":
+        return max_update
+    elif norm == "l2":
+        return np.sqrt(sum_sq / size)
+    else:
+        raise ValueError("Unknown norm: " + str(norm))
+
+
+SWEEPS = {
+    "jacobi": jacobi_sweep,
+    "red_black": red_black_sweep,
+    "sor": red_black_sweep,
+}
+
+SLAB_SWEEPS = {
+    "jacobi": jacobi_sweep_slabs,
+    "red_black": red_black_sweep_slabs,
+    "sor": red_black_sweep_slabs,
+}
@@ -0,0 +1,101 @@
+#   File name: sparse_laplace.py
+#   Author: Nawaf Abdullah
+#   Creation Date: 17/October/2026
+#   Description: Sparse matrix form of the discrete Laplace and Poisson equations with fixed electrodes
+import numpy as np
+from inspect import signature
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+from EM.relaxation import walls
+from EM.cache import geometry_key
+
+
+class LaplaceSystem:
+    def __init__(self, fixed):
+        """
+        Assembles the discrete Laplacian over the free nodes of a grid.
+            - Fixed nodes (electrodes and the walls of the grid) move to the right hand side, so the
+              matrix only depends on the geometry and can be reused for any set of voltages
+        :param fixed: boolean array the shape of the 2D or 3D grid marking the nodes held at a fixed potential
+        """
+        self.shape = fixed.shape
+        self.key = geometry_key(fixed)
+        ndim = fixed.ndim
+        free = ~fixed & ~walls(self.shape)
+        self.free = free
+        self.nodes = np.flatnonzero(free)
+        size = self.nodes.size
+        number = np.full(fixed.size, -1)
+        number[self.nodes] = np.arange(size)
+
+        rows = [np.arange(size)]
+        cols = [np.arange(size)]
+        vals = [np.full(size, 2.0 * ndim)]
+        coupling_rows = []
+        coupling_cols = []
+        strides = np.array([int(np.prod(self.shape[axis + 1:])) for axis in range(ndim)])
+        for axis in range(ndim):
+            for step in (-1, 1):
+                # free nodes are interior nodes, so every neighbour lies inside the grid
+                neighbour = self.nodes + step * strides[axis]
+                inside = number[neighbour] >= 0
+                rows.append(np.flatnonzero(inside))
+                cols.append(number[neighbour[inside]])
+                vals.append(-np.ones(inside.sum()))
+                coupling_rows.append(np.flatnonzero(~inside))
+                coupling_cols.append(neighbour[~inside])
+        self.A = sp.csc_matrix((np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))),
+                               shape=(size, size))
+        coupling_rows = np.concatenate(coupling_rows)
+        self.B = sp.csr_matrix((np.ones(coupling_rows.size), (coupling_rows, np.concatenate(coupling_cols))),
+                               shape=(size, fixed.size))
+        self.__lu = None
+        self.__ssor = None
+
+    def rhs(self, V, source=None):
+        """
+        Right hand side of the system for the fixed potentials held in V
+        :param V: potential array holding the fixed potentials
+        :param source: source term scaled by the squared grid step, None for Laplace
+        """
+        b = self.B @ V.ravel()
+        if source is not None:
+            b += source.take(self.nodes)
+        return b
+
+    def solve_direct(self, V, source=None):
+        """
+        Solves for the free nodes with a sparse LU factorization, computed on the first call only
+        :param V: potential array holding the fixed potentials, the free nodes are overwritten
+        :param source: source term scaled by the squared grid step, None for Laplace
+        :return: V
+        """
+        if self.__lu is None:
+            self.__lu = spla.splu(self.A)
+        np.put(V, self.nodes, self.__lu.solve(self.rhs(V, source)))
+        return V
+
+    def solve_cg(self, V, source=None, tol=1e-10, maxiter=None, callback=None):
+        """
+        Solves for the free nodes with conjugate gradients preconditioned by symmetric Gauss-Seidel,
+        set up on the first call only. The free nodes of V are the initial guess
+        :param V: potential array holding the fixed potentials and the initial guess, updated in place
+        :param source: source term scaled by the squared grid step, None for Laplace
+        :param tol: relative tolerance on the residual
+        :param maxiter: largest number of iterations
+        :param callback: called with the current solution of the free nodes after every iteration
+        :return: V and the convergence flag of scipy.sparse.linalg.cg (0 when converged)
+        """
+        if self.__ssor is None:
+            # symmetric Gauss-Seidel: M = (D + L) D^-1 (D + L)^T, with the lower triangle factorized as is
+            lower = spla.splu(sp.tril(self.A, format="csc"), permc_spec="NATURAL", diag_pivot_thresh=0)
+            diagonal = self.A.diagonal()
+            self.__ssor = spla.LinearOperator(self.A.shape,
+                                              lambda r: lower.solve(diagonal * lower.solve(r), trans="T"))
+        x0 = V.take(self.nodes)
+        # the relative tolerance is called rtol from scipy 1.12 on, and tol before
+        tolerance = {"rtol" if "rtol" in signature(spla.cg).parameters else "tol": tol}
+        x, info = spla.cg(self.A, self.rhs(V, source), x0=x0, maxiter=maxiter, M=self.__ssor,
+                          callback=callback, **tolerance)
+        np.put(V, self.nodes, x)
+        return V, info
@@ -4,17 +4,25 @@
 #   Description: Simulates a population of random walkers
 
 from randomSystems.walker import Walker
+from randomSystems.ensemble import WalkerEnsemble
+from randomSystems.crossings import detect_meetings, TrailIndex
 import matplotlib.pyplot as plt
+import numpy as np
 
 
 class RWPopulation:
     def __init__(self, i_walkers_list=None):
         """
+        The population owns the set of lattice sites occupied by its walkers, shared by walkers avoiding
+        each other (saw_2d/saw_3d with avoid_all=True, or saw)
         :param i_walkers_list: Initial list of random walkers
         """
+        self.walkers = []
+        self.occupied = set()
         if i_walkers_list is not None:
             if isinstance(i_walkers_list, list):
-                self.walkers = i_walkers_list
+                for walker in i_walkers_list:
+                    self.add_walker(walker)
             else:
                 raise ValueError("Value passed is not a list of Walker types")
 
@@ -24,6 +32,7 @@ class RWPopulation:
         :param i_walker: walker instance
         """
         if isinstance(i_walker, Walker):
+            i_walker.occupied = self.occupied
             self.walkers.append(i_walker)
         else:
             raise TypeError("Value passed is not a Walker type")
@@ -41,20 +50,103 @@ class RWPopulation:
             else:
                 continue
 
+    def reset(self):
+        """
+        Resets the paths of every walker and clears the occupied sites, ready for a new experiment
+        """
+        self.occupied.clear()
+        for walker in self.walkers:
+            walker.reset()
+
+    def saw(self, num_steps, dim=2):
+        """
+        Advances every walker in turn, one self avoiding step at a time, each avoiding the sites visited by
+        all the walkers of the population. A trapped walker stops while the others carry on
+        :param num_steps: number of steps of every walker
+        :param dim: number of dimensions, 2 or 3
+        :return: number of walkers still free at the end
+        """
+        for walker in self.walkers:
+            walker.resume()
+            self.occupied.update(walker.sites(dim))
+            walker.z_switch = dim == 3
+        active = [(walker, iter(walker.rng.random(max(0, num_steps - 1)).tolist())) for walker in self.walkers]
+        for n in range(num_steps - 1):
+            active = [(walker, u) for walker, u in active if walker.saw_step(dim, self.occupied, next(u))]
+            if not active:
+                break
+        return len(active)
+
+    def seed_walkers(self, seed=None):
+        """
+        Gives every walker its own generator, spawned from one numpy.random.SeedSequence, so that runs of the
+        population can be reproduced
+        :param seed: seed of the population, None for a fresh one
+        """
+        for walker, child in zip(self.walkers, np.random.SeedSequence(seed).spawn(len(self.walkers))):
+            walker.rng = np.random.default_rng(child)
+
+    def walk(self, num_steps, dim=2, seed=None, workers=None):
+        """
+        Walks every walker of the population at once with the vectorized ensemble engine.
+            - Every walker draws from its own stream spawned from numpy.random.SeedSequence(seed), so the paths
+              only depend on the seed, whatever the number of workers
+        :param num_steps: number of steps
+        :param dim: number of dimensions, 1, 2 or 3
+        :param seed: seed of the random steps, None for a fresh one
+        :param workers: number of processes walking the walkers, None to walk them in this process
+        :return: the WalkerEnsemble holding the new paths as arrays
+        """
+        ensemble = WalkerEnsemble.from_walkers(self.walkers, dim, seed, block_size=1)
+        ensemble.walk(num_steps, workers)
+        ensemble.to_walkers(self.walkers)
+        return ensemble
+
+    def chunks(self, num_steps, dim=2, seed=None, chunk_size=None):
+        """
+        Generates the walks of every walker a chunk of positions at a time, in constant memory whatever their
+        length. The points streamed are not stored and the paths are left as they are: once the walks are over,
+        every walker stands on the final point of its walk (Walker.position), and its next walk starts a new path
+        from there
+        :param num_steps: number of points of every walk, the starting point included
+        :param dim: number of dimensions, 1, 2 or 3
+        :param seed: seed of the random steps, one stream per walker, None for a fresh one
+        :param chunk_size: number of points per chunk, by default about a million positions per chunk
+        :return: generator of (t0, positions), positions being an int64 array of shape (3, num_walkers, T)
+        """
+        ensemble = WalkerEnsemble.from_walkers(self.walkers, dim, seed, block_size=1)
+        for t0, positions in ensemble.chunks(num_steps, chunk_size):
+            yield t0, positions
+        for n, walker in enumerate(self.walkers):
+            if num_steps > 1:
+                walker.position = ensemble.path[:, n, -1]
+            walker.z_switch = dim == 3
+
+    def detect_meetings(self, dim=2):
+        """
+        Finds every pair of walkers standing on the same site at the same step, see crossings.detect_meetings
+        :param dim: number of dimensions, 2 or 3
+        :return: structured array of (walker_a, walker_b, step, position), walker_a and walker_b being indices
+                 in self.walkers
+        """
+        return detect_meetings(self.walkers, dim)
+
+    def trail_index(self, dim=2):
+        """
+        Builds the spatial index of the trails of the walkers, to find where they crossed each other at any time
+        :param dim: number of dimensions, 2 or 3
+        :return: TrailIndex
+        """
+        return TrailIndex(self.walkers, dim)
+
     def detect_intersection_2d(self):
         """
-        detects when two walkers cross paths in 2d
+        detects when two walkers cross paths in 2d, every pair of walkers once
         :return: points of crossing in a list Format: (x, y, step number). False if no intersections occur.
         """
-        intersect = []
-        for W_A in self.walkers:
-            for W_B in self.walkers:
-                if W_A is W_B:
-                    continue
-                for i in range(1, len(W_A.x)):
-                    if W_A.x[i] == W_B.x[i] and \
-                       W_A.y[i] == W_B.y[i]:
-                        intersect.append((W_A.x[i], W_A.y[i], i))
+        found = self.detect_meetings(2)
+        found = found[found["step"] >= 1]
+        intersect = [(x, y, i) for (x, y), i in zip(found["position"].tolist(), found["step"].tolist())]
         if intersect == []:
             return False
         else:
@@ -62,19 +154,11 @@ class RWPopulation:
 
     def detect_intersection_3d(self):
         """
-        detects when two walkers cross paths in 3d
+        detects when two walkers cross paths in 3d, every pair of walkers once
         :return: points of crossing in a list Format: (x, y, z, step number). False if no intersections occur.
         """
-        intersect = []
-        for W_A in self.walkers:
-            for W_B in self.walkers:
-                if W_A is W_B:
-                    continue
-                for i in range(len(W_A.x)):
-                    if W_A.x[i] == W_B.x[i] and \
-                       W_A.y[i] == W_B.y[i] and \
-                       W_A.z[i] == W_B.z[i]:
-                        intersect.append((W_A.x[i], W_A.y[i], W_A.z[i], i))
+        found = self.detect_meetings(3)
+        intersect = [(x, y, z, i) for (x, y, z), i in zip(found["position"].tolist(), found["step"].tolist())]
         if intersect == []:
             return False
         else:
@@ -105,11 +189,10 @@ class RWPopulation:
 """
 # use case example
 bob = Walker(5, 3, 2)
-bob.saw_3d(1000, True)
 jon = Walker()
-jon.saw_3d(1000, True)
 walkers_gang = [bob, jon]
 sys = RWPopulation(walkers_gang)
+sys.saw(1000, 3)
 print(sys.detect_intersection_3d())
 sys.plot_3d()
 """
\ No newline at end of file
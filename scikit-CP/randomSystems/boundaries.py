@@ -0,0 +1,119 @@
+#   File: boundaries.py
+#   Author: Nawaf Abdullah
+#   Creation Date: 17/October/2026
+#   Description: Absorbing and reflecting boundaries of lattice random walks, and first passage results
+import numpy as np
+
+KINDS = ("absorbing", "reflecting")
+
+
+def _check_kind(kind):
+    if kind not in KINDS:
+        raise ValueError("Boundary kind must be 'absorbing' or 'reflecting'")
+    return kind
+
+
+class Box:
+    def __init__(self, lower, upper, kind="absorbing"):
+        """
+        Walls of a box: the region beyond them absorbs the walkers, or reflects them
+        :param lower: lowest coordinates of the sites inside the box, one per dimension
+        :param upper: highest coordinates of the sites inside the box, one per dimension
+        :param kind: "absorbing" or "reflecting"
+        """
+        self.lower = np.asarray(lower, dtype=np.int64)
+        self.upper = np.asarray(upper, dtype=np.int64)
+        self.kind = _check_kind(kind)
+
+    def hits(self, positions):
+        """
+        :param positions: integer array of shape (..., dim)
+        :return: boolean array of shape (...), True outside the box
+        """
+        return np.any((positions < self.lower) | (positions > self.upper), axis=-1)
+
+
+class Sphere:
+    def __init__(self, center, radius, kind="absorbing", inside=False):
+        """
+        Sphere (a circle in 2D, an interval in 1D): escaping it, or reaching it as a target when inside=True
+        :param center: coordinates of the center, one per dimension
+        :param radius: radius in lattice units
+        :param kind: "absorbing" or "reflecting"
+        :param inside: False for the region beyond the sphere, True for the ball itself (a target)
+        """
+        self.center = np.asarray(center, dtype=np.int64)
+        self.radius = radius
+        self.kind = _check_kind(kind)
+        self.inside = inside
+
+    def hits(self, positions):
+        """
+        :param positions: integer array of shape (..., dim)
+        :return: boolean array of shape (...), True in the region of the boundary
+        """
+        r2 = np.sum((positions - self.center) ** 2, axis=-1)
+        if self.inside:
+            return r2 <= self.radius ** 2
+        return r2 > self.radius ** 2
+
+
+class Mask:
+    def __init__(self, mask, origin=None, kind="absorbing"):
+        """
+        Any set of lattice sites, given as a boolean array: traps or targets when absorbing, obstacles when
+        reflecting. Sites outside the array are free
+        :param mask: boolean array of dim dimensions, True on the sites of the boundary
+        :param origin: lattice coordinates of mask[0, 0(, 0)], the origin by default
+        :param kind: "absorbing" or "reflecting"
+        """
+        self.mask = np.asarray(mask, dtype=bool)
+        self.origin = np.zeros(self.mask.ndim, dtype=np.int64) if origin is None else np.asarray(origin)
+        self.kind = _check_kind(kind)
+
+    def hits(self, positions):
+        """
+        :param positions: integer array of shape (..., dim)
+        :return: boolean array of shape (...), True on the sites of the mask
+        """
+        index = positions - self.origin
+        inside = np.all((index >= 0) & (index < self.mask.shape), axis=-1)
+        hit = np.zeros(inside.shape, dtype=bool)
+        hit[inside] = self.mask[tuple(np.moveaxis(index[inside], -1, 0))]
+        return hit
+
+
+def passage_dtype(dim):
+    """
+    Structured dtype of first passage results: the step of the absorption (-1 for walkers still alive at the
+    end), where it happened (the last position of the walkers still alive) and which boundary absorbed the
+    walker (-1 if none)
+    :param dim: number of dimensions, 1, 2 or 3
+    """
+    return np.dtype([("time", np.int64), ("position", np.int64, (dim,)), ("boundary", np.int64)])
+
+
+def survival_probability(passages, times):
+    """
+    Fraction of the walkers not absorbed yet, at every given step
+    :param passages: first passage results, see passage_dtype
+    :param times: step numbers
+    :return: array of probabilities
+    """
+    absorbed = np.sort(passages["time"][passages["time"] >= 0])
+    return 1 - np.searchsorted(absorbed, times, side="right") / len(passages)
+
+
+def passage_time_distribution(passages, bins=50, boundary=None):
+    """
+    Histogram of the first passage times of the absorbed walkers
+    :param passages: first passage results, see passage_dtype
+    :param bins: number of bins or bin edges, as for numpy.histogram
+    :param boundary: only counts the walkers absorbed by this boundary, None for all
+    :return: counts normalized by the number of walkers, and bin edges
+    """
+    absorbed = passages["time"] >= 0
+    if boundary is not None:
+        absorbed &= passages["boundary"] == boundary
+    counts, edges = np.histogram(passages["time"][absorbed], bins=bins)
+    return counts / max(1, len(passages)), edges
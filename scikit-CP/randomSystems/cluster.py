@@ -3,21 +3,64 @@
 #   Creation Date: 13/Nov/2018
 #   Description: Modeling of cluster growth
 import numpy as np
-from random import randint
+import warnings
 import matplotlib.pyplot as plt
-import time
+from randomSystems.frontier import IndexedSet
+from randomSystems.dla import DLAEngine
+from randomSystems.occupancy import DenseGrid, TiledGrid
+from randomSystems.morphology import ClusterMorphology
+
+
+# states of the sites of the growth engines: EDGE marks the end of the window of an engine, the space goes on
+EMPTY, OCCUPIED, PERIMETER, WALL, EDGE = 0, 1, 2, 3, 4
 
 
 class Cluster:
-    def __init__(self, i_size):
+    def __init__(self, i_size, seed=None, backend="dense", tile_size=32):
         """
-        :param i_size: size of the space the cluster is allowed to grow within
+        Lattice cluster grown from seed particles.
+            - The occupied sites are held by an occupancy backend, exported to a dense array for plotting only
+            - Shape statistics (self.morphology, see ClusterMorphology) are updated with every particle attached
+            - The growth engines work on a dense window around the cluster, enlarged as the cluster grows, so
+              their memory follows the size of the cluster rather than the size of the space
+        :param i_size: size of the space the cluster is allowed to grow within, None for no limit (tiled backend)
+        :param seed: seed or numpy.random.Generator of the growth
+        :param backend: occupancy of the sites, "dense" (DenseGrid, one byte per site of the space) or "tiled"
+                        (TiledGrid, tiles allocated as the cluster reaches them)
+        :param tile_size: number of sites along every side of the tiles of the tiled backend
         """
+        if backend not in ("dense", "tiled"):
+            raise ValueError("Backend must be 'dense' or 'tiled'")
+        if i_size is None and backend == "dense":
+            raise ValueError("A dense backend needs the size of the space")
         self.size = i_size
-        self.growth = None
+        self.backend = backend
+        self.tile_size = tile_size
+        self.occupancy = None
+        self.morphology = None
         self.z_swtich = False
+        # number of particles added by the last growth
+        self.num_attached = 0
         self.particles_2d = list()
         self.particles_3d = list()
+        self.rng = np.random.default_rng(seed)
+        self.__eden = None
+        self.__eden_count = 0
+        self.__dla = None
+        self.__dla_count = 0
+
+    @property
+    def growth(self):
+        """
+        Occupancy exported to a dense array of 0 and 1: the whole space, or the box around the cluster when the
+        space has no limit (see self.occupancy.bounds())
+        """
+        if self.occupancy is None:
+            return None
+        if self.size is None:
+            return self.occupancy.to_dense()
+        dim = self.occupancy.dim
+        return self.occupancy.to_dense((0,) * dim, (self.size - 1,) * dim)
 
     def add_seed_particle(self, x, y, z=None):
         """
@@ -26,224 +69,196 @@ class Cluster:
         :param y: y-location
         :param z: z-location
         """
+        site = (x, y) if z is None else (x, y, z)
+        if self.occupancy is None or self.occupancy.dim != len(site):
+            shape = None if self.size is None else (self.size,) * len(site)
+            if self.backend == "dense":
+                self.occupancy = DenseGrid(shape)
+            else:
+                self.occupancy = TiledGrid(len(site), self.tile_size, shape)
+            self.morphology = ClusterMorphology(len(site), site)
+        if not self.occupancy.contains([site])[0]:
+            self.morphology.update([site])
+        self.occupancy.add([site])
+        self.z_swtich = z is not None
         if z is None:
-            self.growth = np.zeros((self.size, self.size))
-            self.particles_2d.append((x, y))
-            self.growth[x][y] = 1
+            self.particles_2d.append(site)
         else:
-            self.growth = np.zeros((self.size, self.size, self.size))
-            self.particles_3d.append((x, y, z))
-            self.growth[x][y][z] = 1
+            self.particles_3d.append(site)
 
-    def Eden_growth(self, num_iter):
+    def __result(self):
+        return self.growth if self.backend == "dense" else self.occupancy
+
+    def __window(self, lower, upper, margin=0):
         """
-        Grow the cluster using Eden cluster growth model.
-        :param num_iter: number of iterations
-        :return: growth numpy array
+        Box of sites enlarged by a margin, clipped to the space
+        :return: lowest and highest coordinates of the box
         """
-        if self.growth.shape == (self.size, self.size, self.size):
-            self.z_swtich = True
-            self.__Eden_growth_3d(num_iter)
-        elif self.growth.shape == (self.size, self.size):
-            self.z_swtich = False
-            self.__Eden_growth_2d(num_iter)
-        return self.growth
+        lower, upper = np.asarray(lower) - margin, np.asarray(upper) + margin
+        if self.size is not None:
+            lower, upper = np.maximum(lower, 0), np.minimum(upper, self.size - 1)
+        return lower, upper
 
-    def __Eden_growth_2d(self, N):
+    def Eden_growth(self, num_iter):
         """
-        Grow the cluster using Eden cluster growth model in 2D
-        :param N: number of iterations
+        Grow the cluster using Eden cluster growth model: every iteration occupies a site picked uniformly
+        among the empty sites touching the cluster (its perimeter).
+            - The perimeter is kept in an IndexedSet, so picking, removing and adding sites takes O(1) time
+              whatever the size of the cluster
+            - The cluster does not grow onto the outermost layer of sites of the space. The number of particles
+              actually added, fewer once the space is full, is kept in self.num_attached
+        :param num_iter: number of particles added
+        :return: growth numpy array with the dense backend, the TiledGrid itself with the tiled one
         """
-        grounded = list()
-        for n in range(N):
-            for coord in self.particles_2d:
-                if coord in grounded:
-                    continue
-                x = coord[0]
-                y = coord[1]
-                try:
-                    # Make sure index stays within range
-                    index_check_right = self.growth[x + 1][y]
-                    index_check_left  = self.growth[x - 1][y]
-                    index_check_up    = self.growth[x][y + 1]
-                    index_check_down  = self.growth[x][y - 1]
-                except IndexError:
-                    continue
-                r = randint(0, 100)
-                if r <= 25:
-                    if self.growth[x+1][y] != 1:
-                        self.growth[x+1][y] = 1
-                        self.particles_2d.append((x+1, y))
-                    else:
-                        if self.growth[x-1][y] != 1:
-                            self.growth[x-1][y] = 1
-                            self.particles_2d.append((x-1, y))
-                        elif self.growth[x][y+1] != 1:
-                            self.growth[x][y+1] = 1
-                            self.particles_2d.append((x, y+1))
-                        elif self.growth[x][y-1] != 1:
-                            self.growth[x][y-1] = 1
-                            self.particles_2d.append((x, y-1))
-                        else:
-                            grounded.append((x, y))
-                # --------------- -x --------------- #
-                elif 25 < r <= 50:
-                    if self.growth[x-1][y] != 1:
-                        self.growth[x-1][y] = 1
-                        self.particles_2d.append((x - 1, y))
-                    else:
-                        if self.growth[x+1][y] != 1:
-                            self.growth[x+1][y] = 1
-                            self.particles_2d.append((x + 1, y))
-                        elif self.growth[x][y+1] != 1:
-                            self.growth[x][y+1] = 1
-                            self.particles_2d.append((x, y + 1))
-                        elif self.growth[x][y-1] != 1:
-                            self.growth[x][y-1] = 1
-                            self.particles_2d.append((x, y - 1))
-                        else:
-                            grounded.append((x, y))
-                # --------------- +y --------------- #
-                elif 50 < r <= 75:
-                    if self.growth[x][y+1] != 1:
-                        self.growth[x][y+1] = 1
-                        self.particles_2d.append((x, y + 1))
-                    else:
-                        if self.growth[x-1][y] != 1:
-                            self.growth[x-1][y] = 1
-                            self.particles_2d.append((x - 1, y))
-                        elif self.growth[x+1][y] != 1:
-                            self.growth[x+1][y] = 1
-                            self.particles_2d.append((x + 1, y))
-                        elif self.growth[x][y-1] != 1:
-                            self.growth[x][y-1] = 1
-                            self.particles_2d.append((x, y - 1))
-                        else:
-                            grounded.append((x, y))
-                # --------------- -y --------------- #
-                else:
-                    if self.growth[x][y-1] != 1:
-                        self.growth[x][y-1] = 1
-                        self.particles_2d.append((x, y - 1))
-                    else:
-                        if self.growth[x-1][y] != 1:
-                            self.growth[x-1][y] = 1
-                            self.particles_2d.append((x - 1, y))
-                        elif self.growth[x+1][y] != 1:
-                            self.growth[x+1][y] = 1
-                            self.particles_2d.append((x + 1, y))
-                        elif self.growth[x][y+1] != 1:
-                            self.growth[x][y+1] = 1
-                            self.particles_2d.append((x, y + 1))
-                        else:
-                            grounded.append((x, y))
+        self.z_swtich = self.occupancy.dim == 3
+        before = len(self.occupancy)
+        self.__Eden_growth(num_iter)
+        self.num_attached = len(self.occupancy) - before
+        return self.__result()
 
-    def __Eden_growth_3d(self, N):
+    def __sites(self):
         """
-        Grow the cluster using Eden cluster growth model in 3D
-        :param N:number of iterations
-        :return:
+        Flat grid of the state of every site (EMPTY, OCCUPIED, PERIMETER, WALL or EDGE) of a window twice as large
+        as the cluster, and the flat offsets of the neighbours of a site. Rebuilt when particles were added by
+        other means or the cluster reached the edge of the window
+        :return: lowest coordinates and shape of the window, the grid, the perimeter and the offsets
         """
-        time.sleep(5)
+        if self.__eden is None or self.__eden_count != len(self.occupancy):
+            lower, upper = self.occupancy.bounds()
+            margin = max(8, int(np.max(upper - lower)) // 2)
+            # the layer around the sites the cluster may grow onto, the outermost layer of the space at most
+            lower, upper = self.__window(lower - 1, upper + 1, margin)
+            shape = tuple(int(n) for n in upper - lower + 1)
+            occupied = self.occupancy.to_dense(lower, upper) == 1
+            state = np.full(shape, EMPTY, dtype=np.uint8)
+            border = np.ones(shape, dtype=bool)
+            border[(slice(1, -1),) * len(shape)] = False
+            state[border] = EDGE
+            if self.size is not None:
+                for axis in range(len(shape)):
+                    if lower[axis] == 0:
+                        state[(slice(None),) * axis + (0,)] = WALL
+                    if upper[axis] == self.size - 1:
+                        state[(slice(None),) * axis + (-1,)] = WALL
+            state[occupied] = OCCUPIED
+            offsets = []
+            stride = 1
+            for axis in reversed(range(len(shape))):
+                offsets += [stride, -stride]
+                stride *= shape[axis]
+            # empty sites next to the cluster make up the perimeter
+            touching = np.zeros(shape, dtype=bool)
+            for axis in range(len(shape)):
+                touching |= np.roll(occupied, 1, axis) | np.roll(occupied, -1, axis)
+            perimeter = touching & (state == EMPTY)
+            state[perimeter] = PERIMETER
+            self.__eden = (lower, shape, bytearray(state.tobytes()),
+                           IndexedSet(np.flatnonzero(perimeter).tolist()), offsets)
+            self.__eden_count = len(self.occupancy)
+        return self.__eden
 
-    def DLA_growth(self, num_iter, num_steps):
+    def __Eden_growth(self, N):
         """
-        Grows the cluster using diffusion limited aggregation
-        :param num_iter: number of iterations
-        :param num_steps: number of steps for the randomly moving particle
-        :return: growth numpy array
+        Grow the cluster using Eden cluster growth model in 2D or 3D
+        :param N: number of particles added
         """
-        if self.growth.shape == (self.size, self.size, self.size):
-            self.z_swtich = True
-            self.__DLA_growth_3d(num_iter, num_steps)
-        elif self.growth.shape == (self.size, self.size):
-            self.z_swtich = False
-            self.__DLA_growth_2d(num_iter, num_steps)
-        return self.growth
+        while N > 0:
+            origin, shape, state, perimeter, offsets = self.__sites()
+            items, index = perimeter.items, perimeter.index
+            added = []
+            cramped = False
+            for u in self.rng.random(min(N, 65536)).tolist():
+                if not items or cramped:
+                    break
+                site = perimeter.pop_random(u)
+                state[site] = OCCUPIED
+                added.append(site)
+                for offset in offsets:
+                    neighbour = site + offset
+                    if state[neighbour] == EMPTY:
+                        state[neighbour] = PERIMETER
+                        index[neighbour] = len(items)
+                        items.append(neighbour)
+                    elif state[neighbour] == EDGE:
+                        cramped = True
+            self.__attach(added, origin, shape)
+            self.__eden_count += len(added)
+            N -= len(added)
+            if cramped:
+                self.__eden = None
+            elif not items:
+                break
 
-    def __DLA_growth_2d(self, N, N_steps):
+    def __attach(self, added, origin, shape):
         """
-        Grows the cluster using diffusion limited aggregation in 2D
-        :param N: number of iterations.
-        :param N_steps: the number of steps of the random moving particle
+        Records sites occupied by the growth engines in the occupancy, the morphology and the particle lists
+        :param added: flat indices of the new particles in the window of the engine
+        :param origin: lowest coordinates of the window
+        :param shape: shape of the window
         """
-        for n in range(N):
-            # Select random coordinates for the randomly moving particle
-            x = randint(0, self.size)
-            y = randint(0, self.size)
+        sites = np.stack(np.unravel_index(np.array(added, dtype=np.int64), shape), axis=1) + origin
+        self.occupancy.add(sites)
+        self.morphology.update(sites)
+        particles = self.particles_3d if len(shape) == 3 else self.particles_2d
+        particles.extend(map(tuple, sites.tolist()))
 
-            # Make sure the location is still within bounds
-            try:
-                index_check = self.growth[x+1][y] + self.growth[x-1][y] + self.growth[x][y+1] + self.growth[x][y-1]
-            except IndexError:
-                continue
-
-            # Check if there isn't a particle already assigned to the randomly chosen location
-            if self.growth[x][y] == 1:
-                continue
-            else:
-                self.growth[x][y] = 1
-
-            # start random walk for the particle
-            for i in range(N_steps):
-
-                # Make sure the location is still within bounds
-                try:
-                    index_check = self.growth[x + 1][y] + self.growth[x - 1][y] + self.growth[x][y + 1] + \
-                                  self.growth[x][y - 1]
-                except IndexError:
-                    continue
+    def DLA_growth(self, num_iter, num_steps=None, sticking=1.0):
+        """
+        Grows the cluster using diffusion limited aggregation: walkers are released one at a time from a circle
+        (a sphere in 3D) around the first seed particle and walk until they stick to the cluster (see DLAEngine)
+            - Close to the edges of the space, walkers leaving the largest circle around the seed that fits in the
+              space are relaunched. Growth stops early once the cluster reaches that circle, with a warning, and
+              the number of particles actually added is kept in self.num_attached
+        :param num_iter: number of particles added
+        :param num_steps: ignored, walkers no longer have a step limit
+        :param sticking: probability that a walker sticks on contact with the cluster
+        :return: growth numpy array with the dense backend, the TiledGrid itself with the tiled one
+        """
+        self.z_swtich = self.occupancy.dim == 3
+        self.num_attached = self.__DLA_growth(num_iter, sticking)
+        if self.num_attached < num_iter:
+            warnings.warn("DLA growth reached the edges of the space after %d of %d particles"
+                          % (self.num_attached, num_iter))
+        return self.__result()
 
-                r = randint(0, 100)
-                if r <= 25:
-                    # Move to the right
-                    if self.growth[x+1][y] != 1:
-                        self.growth[x+1][y] = self.growth[x][y]
-                        self.growth[x][y] = 0
-                        x = x + 1
-                        y = y
-                    else:
-                        self.particles_2d.append((x, y))
-                        break
-                elif 25 < r <= 50:
-                    # Move to the left
-                    if self.growth[x-1][y] != 1:
-                        self.growth[x-1][y] = self.growth[x][y]
-                        self.growth[x][y] = 0
-                        x = x - 1
-                        y = y
-                    else:
-                        self.particles_2d.append((x, y))
-                        break
-                elif 50 < r <= 75:
-                    # Move up
-                    if self.growth[x][y+1] != 1:
-                        self.growth[x][y+1] = self.growth[x][y]
-                        self.growth[x][y] = 0
-                        x = x
-                        y = y + 1
-                    else:
-                        self.particles_2d.append((x, y))
-                        break
-                else:
-                    # Move down
-                    if self.growth[x][y-1] != 1:
-                        self.growth[x][y-1] = self.growth[x][y]
-                        self.growth[x][y] = 0
-                        x = x
-                        y = y - 1
-                    else:
-                        self.particles_2d.append((x, y))
-                        break
+    def __engine(self):
+        """
+        DLA engine working on a window around the first seed particle, half again as large as the cluster.
+        Rebuilt when particles were added by other means or the cluster outgrew the window
+        :return: lowest coordinates of the window, the engine, and whether the window can still be enlarged
+        """
+        if self.__dla is None or self.__dla_count != len(self.occupancy):
+            center = np.array((self.particles_3d if self.z_swtich else self.particles_2d)[0])
+            lower, upper = self.occupancy.bounds()
+            reach = np.linalg.norm(np.maximum(upper - center, center - lower))
+            lower, upper = self.__window(center, center, int(1.5 * reach) + 48)
+            edge = np.min(np.minimum(center - lower, upper - center))
+            room = np.inf if self.size is None else np.min(np.minimum(center, self.size - 1 - center))
+            engine = DLAEngine(self.occupancy.to_dense(lower, upper) == 1, center - lower, self.rng)
+            self.__dla = (lower, engine, edge < room)
+            self.__dla_count = len(self.occupancy)
+        return self.__dla
 
-    def __DLA_growth_3d(self, N, N_steps):
+    def __DLA_growth(self, N, sticking):
         """
-        Grows the cluster using diffusion limited aggregation in 2D
-        :param N: number of iterations.
-        :param N_steps: the number of steps of the random moving particle
+        Grows the cluster using diffusion limited aggregation in 2D or 3D
+        :param N: number of particles added
+        :param sticking: sticking probability
+        :return: number of particles attached
         """
-        time.sleep(5)
-        pass
+        attached = 0
+        while attached < N:
+            origin, engine, spare = self.__engine()
+            engine.sticking = sticking
+            # the walkers are only confined to the window once it cannot be enlarged any more
+            added = engine.grow(N - attached, to_edge=not spare)
+            self.__attach(added, origin, engine.shape)
+            self.__dla_count += len(added)
+            attached += len(added)
+            if attached == N or not spare:
+                break
+            self.__dla = None
+        return attached
 
     def plot(self):
         plt.pcolormesh(self.growth)
@@ -253,8 +268,8 @@ class Cluster:
 
 """
 # Example use case
-bob = Cluster(100)
-bob.add_seed_particle(50, 50)
-bob.DLA_growth(1000, 10000)
+bob = Cluster(200)
+bob.add_seed_particle(100, 100)
+bob.DLA_growth(1000)
 bob.plot()
-"""
\ No newline at end of file
+"""
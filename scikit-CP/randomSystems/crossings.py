@@ -0,0 +1,176 @@
+#   File: crossings.py
+#   Author: Nawaf Abdullah
+#   Creation Date: 17/October/2026
+#   Description: Vectorized detection of random walkers meeting each other or crossing each other's trails
+import numpy as np
+from randomSystems.saw import site_keys
+
+
+def stack_paths(walkers, dim):
+    """
+    Stacks the paths of walkers of any lengths into flat arrays
+    :param walkers: list of Walker instances
+    :param dim: number of dimensions, 2 or 3
+    :return: walker index, step number and position (array of shape (num_points, dim)) of every point
+    """
+    lengths = [len(w.x) for w in walkers]
+    walker = np.repeat(np.arange(len(walkers)), lengths)
+    step = np.concatenate([np.arange(n) for n in lengths]) if walkers else np.zeros(0, dtype=int)
+    position = np.zeros((walker.size, dim), dtype=np.int64)
+    start = 0
+    for w, n in zip(walkers, lengths):
+        position[start:start + n] = np.stack([w.x, w.y, w.z][:dim], axis=1)
+        start += n
+    return walker, step, position
+
+
+def meeting_dtype(dim):
+    """
+    Structured dtype of the meetings: the two walkers, the step number and the lattice site
+    :param dim: number of dimensions, 2 or 3
+    """
+    return np.dtype([("walker_a", np.int64), ("walker_b", np.int64), ("step", np.int64),
+                     ("position", np.int64, (dim,))])
+
+
+def _pairs_in_groups(change):
+    """
+    Every pair of elements within runs of a sorted array, a run of k elements holding k (k - 1) / 2 pairs
+    :param change: boolean array, True on the first element of every run
+    :return: indices of the first and the second element of every pair
+    """
+    size = change.size
+    starts = np.flatnonzero(change)
+    group = np.cumsum(change) - 1
+    sizes = np.diff(np.append(starts, size))
+    # every element pairs with the elements after it in its run
+    later = sizes[group] - 1 - (np.arange(size) - starts[group])
+    first = np.repeat(np.arange(size), later)
+    second = first + np.arange(first.size) - np.repeat(np.cumsum(later) - later, later) + 1
+    return first, second
+
+
+def detect_meetings(walkers, dim=2):
+    """
+    Finds every pair of walkers standing on the same site at the same step.
+        - The points of all the paths are sorted by (step, site) once, so walkers meeting at a step end up next
+          to each other: O(W T log(W T)) plus the number of meetings, instead of comparing every pair of walkers
+          step by step
+        - Paths of different lengths are compared over the steps they share
+    :param walkers: list of Walker instances
+    :param dim: number of dimensions, 2 or 3
+    :return: structured array of (walker_a, walker_b, step, position), every pair once with walker_a < walker_b,
+             sorted by step
+    """
+    walker, step, position = stack_paths(walkers, dim)
+    order = np.lexsort((walker,) + tuple(position[:, axis] for axis in reversed(range(dim))) + (step,))
+    walker, step, position = walker[order], step[order], position[order]
+
+    # groups of points on the same site at the same step
+    change = np.ones(walker.size, dtype=bool)
+    change[1:] = (step[1:] != step[:-1]) | np.any(position[1:] != position[:-1], axis=1)
+    first, second = _pairs_in_groups(change)
+
+    found = np.zeros(first.size, dtype=meeting_dtype(dim))
+    found["walker_a"] = walker[first]
+    found["walker_b"] = walker[second]
+    found["step"] = step[first]
+    found["position"] = position[first]
+    return found[np.lexsort((found["walker_b"], found["walker_a"], found["step"]))]
+
+
+class TrailIndex:
+    def __init__(self, walkers, dim=2):
+        """
+        Spatial index of the trails of walkers: every lattice site visited, by which walkers and first when.
+            - The points of all the paths are packed into site keys and sorted once, keeping only the first
+              visit of every walker to every site, so every query is a binary search and every whole population
+              statistic a pass over the sorted visits: near linear in the total number of steps
+        :param walkers: list of Walker instances
+        :param dim: number of dimensions, 2 or 3
+        """
+        self.dim = dim
+        self.num_walkers = len(walkers)
+        walker, step, position = stack_paths(walkers, dim)
+        keys = site_keys(position)
+        order = np.lexsort((step, walker, keys))
+        keys, walker, step, position = keys[order], walker[order], step[order], position[order]
+        # first visit of every walker to every site
+        first = np.ones(keys.size, dtype=bool)
+        first[1:] = (keys[1:] != keys[:-1]) | (walker[1:] != walker[:-1])
+        self.keys = keys[first]
+        self.walker = walker[first]
+        self.step = step[first]
+        self.position = position[first]
+        self.sites = np.unique(self.keys)
+
+    def __visits(self, site):
+        """
+        Range of the visits to a site in the sorted arrays
+        :param site: coordinates of the site
+        """
+        key = site_keys(np.array([site], dtype=np.int64))[0]
+        return np.searchsorted(self.keys, key), np.searchsorted(self.keys, key, side="right")
+
+    def visitors(self, site):
+        """
+        Walkers that visited a site
+        :param site: coordinates of the site, a tuple of dim integers
+        :return: array of walker indices
+        """
+        lo, hi = self.__visits(site)
+        return self.walker[lo:hi]
+
+    def first_visits(self, site):
+        """
+        First visit of every walker that visited a site
+        :param site: coordinates of the site, a tuple of dim integers
+        :return: arrays of walker indices and of the step numbers of their first visits
+        """
+        lo, hi = self.__visits(site)
+        return self.walker[lo:hi], self.step[lo:hi]
+
+    def distinct_sites(self):
+        """
+        Number of distinct sites visited by the whole population
+        """
+        return self.sites.size
+
+    def sites_per_walker(self):
+        """
+        Number of distinct sites visited by every walker
+        :return: array of num_walkers counts
+        """
+        return np.bincount(self.walker, minlength=self.num_walkers)
+
+    def crossings(self):
+        """
+        Every pair of walkers whose trails share a site, at any time
+        :return: structured array of (walker_a, walker_b, position, step_a, step_b), every shared site of every
+                 pair once with walker_a < walker_b and the steps of their first visits
+        """
+        change = np.ones(self.keys.size, dtype=bool)
+        change[1:] = self.keys[1:] != self.keys[:-1]
+        a, b = _pairs_in_groups(change)
+        found = np.zeros(a.size, dtype=[("walker_a", np.int64), ("walker_b", np.int64),
+                                        ("position", np.int64, (self.dim,)),
+                                        ("step_a", np.int64), ("step_b", np.int64)])
+        found["walker_a"] = self.walker[a]
+        found["walker_b"] = self.walker[b]
+        found["position"] = self.position[a]
+        found["step_a"] = self.step[a]
+        found["step_b"] = self.step[b]
+        return found
+
+    def overlaps(self):
+        """
+        Number of sites shared by the trails of every pair of walkers
+        :return: symmetric array of shape (num_walkers, num_walkers), the diagonal holding the distinct sites
+                 of every walker
+        """
+        found = self.crossings()
+        W = self.num_walkers
+        overlap = np.bincount(found["walker_a"] * W + found["walker_b"], minlength=W * W).reshape(W, W)
+        overlap = overlap + overlap.T
+        overlap[np.diag_indices(W)] = self.sites_per_walker()
+        return overlap
@@ -0,0 +1,182 @@
+#   File: dla.py
+#   Author: Nawaf Abdullah
+#   Creation Date: 17/October/2026
+#   Description: Diffusion limited aggregation in 2D and 3D with launch spheres, a kill radius and distance map jumps
+import numpy as np
+from math import sqrt, dist
+from operator import mul
+
+
+def _uniforms(rng, size=65536):
+    """
+    Endless stream of uniform random numbers in [0, 1), drawn from the generator in large batches
+    :param rng: numpy.random.Generator
+    """
+    while True:
+        yield from rng.random(size).tolist()
+
+
+def _directions(rng, dim, size=16384):
+    """
+    Endless stream of uniformly distributed unit vectors (normalized gaussian vectors), drawn in large batches
+    :param rng: numpy.random.Generator
+    :param dim: number of dimensions
+    """
+    while True:
+        vectors = rng.standard_normal((size, dim))
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        yield from vectors.tolist()
+
+
+class DLAEngine:
+    def __init__(self, occupied, center, rng, sticking=1.0, jump_range=16, kill_factor=10.0):
+        """
+        Grows a diffusion limited aggregate one walker at a time, in far fewer steps than a plain lattice walk.
+            - Walkers are launched from a circle (a sphere in 3D) just beyond the cluster and relaunched once
+              beyond the kill radius
+            - A distance map holds, for every site, its distance to the cluster rounded down and capped at
+              jump_range. It is updated around every new particle with the minimum of a precomputed stencil.
+              Coarser maps of cells of jump_range, jump_range^2... sites take over where the finer ones are
+              capped, so the jumps grow with the empty space around the walker
+            - Wherever the map says the cluster is at least 4 sites away, the walker jumps to a random point of the
+              circle (sphere) free of particles around it (walk on spheres) instead of stepping; beyond the map,
+              the sphere reaches out to the cluster's radius. Lattice steps are only taken right next to the cluster
+            - Occupancy and the finest distance map take one byte per site
+        :param occupied: 2D or 3D boolean array of the sites already occupied
+        :param center: coordinates of the seed, the center of the launch sphere
+        :param rng: numpy.random.Generator
+        :param sticking: probability that a walker sticks when it stands next to the cluster, otherwise it steps
+                         on and tries again at its next contact
+        :param jump_range: largest distance held by the distance maps, in lattice units (cells for the coarse
+                           maps)
+        :param kill_factor: kill radius as a multiple of the launch radius
+        """
+        self.shape = occupied.shape
+        self.dim = occupied.ndim
+        self.center = [float(c) for c in center]
+        self.sticking = sticking
+        self.jump_range = jump_range
+        self.kill_factor = kill_factor
+        self.uniform = _uniforms(rng)
+        self.directions = _directions(rng, self.dim)
+        self.strides = [int(np.prod(self.shape[axis + 1:])) for axis in range(self.dim)]
+        self.offsets = [sign * stride for stride in self.strides for sign in (1, -1)]
+        self.occupied = bytearray(np.ascontiguousarray(occupied, dtype=np.uint8).tobytes())
+        window = np.indices((2 * jump_range + 1,) * self.dim) - jump_range
+        self.stencil = np.minimum(np.floor(np.sqrt(np.sum(window ** 2, axis=0))), jump_range).astype(np.uint8)
+        # distance maps of cells of 1, J, J^2... sites, up to cells that span the whole grid
+        self.levels = []
+        cell = 1
+        while True:
+            shape = tuple(-(-n // cell) for n in self.shape)
+            distance = bytearray(np.full(int(np.prod(shape)), jump_range, dtype=np.uint8).tobytes())
+            strides = [int(np.prod(shape[axis + 1:])) for axis in range(self.dim)]
+            self.levels.append((cell, strides, distance, np.frombuffer(distance, dtype=np.uint8).reshape(shape)))
+            if cell * jump_range >= max(self.shape):
+                break
+            cell *= jump_range
+        self.distance = self.levels[0][2]
+        # largest distance from the seed at which a walker and its neighbours stay inside the grid
+        self.edge = min(min(c, n - 1 - c) for c, n in zip(self.center, self.shape)) - 1
+        self.radius = 0.0
+        for site in np.argwhere(occupied):
+            self.__mark(site.tolist())
+
+    def __mark(self, site):
+        """
+        Updates the distance maps and the radius of the cluster around a new particle. A coarse map only changes
+        when the particle lands in one of its cells that was empty so far
+        :param site: coordinates of the particle
+        """
+        J = self.jump_range
+        for cell, strides, distance, distance_map in self.levels:
+            index = [c // cell for c in site]
+            if distance_map[tuple(index)] == 0:
+                break
+            grid = []
+            window = []
+            for c, n in zip(index, distance_map.shape):
+                lo, hi = max(0, c - J), min(n, c + J + 1)
+                grid.append(slice(lo, hi))
+                window.append(slice(lo - c + J, hi - c + J))
+            grid = tuple(grid)
+            np.minimum(distance_map[grid], self.stencil[tuple(window)], out=distance_map[grid])
+        self.radius = max(self.radius, dist(site, self.center))
+
+    def __free_radius(self, position, d):
+        """
+        Lower bound of the distance from a walker to the cluster, looked up in coarser and coarser maps while
+        the finer ones are capped
+        :param position: coordinates of the walker
+        :param d: distance read in the finest map
+        """
+        J = self.jump_range
+        free = d
+        # two sites in cells k cells apart are at least (k - sqrt(dim)) cells apart
+        margin = sqrt(self.dim)
+        for cell, strides, distance, distance_map in self.levels[1:]:
+            k = distance[sum(map(mul, [p // cell for p in position], strides))]
+            free = max(free, (k - margin) * cell)
+            if k < J:
+                break
+        return free
+
+    def __jump(self, position, rho):
+        """
+        Moves a walker to the nearest site of a random point on the sphere of radius rho around it
+        """
+        return [round(p + rho * d) for p, d in zip(position, next(self.directions))]
+
+    def grow(self, num_particles, to_edge=False):
+        """
+        Attaches particles one walker at a time
+        :param num_particles: number of particles to attach
+        :param to_edge: False to stop as soon as the launch sphere and the reach of the distance maps no longer fit
+                        in the grid (the grid is then enlarged by the caller). True to shrink them to the room
+                        left instead: walkers leaving the largest sphere around the seed that fits in the grid are
+                        relaunched, and growth only stops once the cluster reaches that sphere
+        :return: flat indices of the new particles
+        """
+        uniform = self.uniform
+        center = self.center
+        sticking = self.sticking
+        occupied, distance, offsets, strides = self.occupied, self.distance, self.offsets, self.strides
+        J = self.jump_range
+        num_offsets = len(offsets)
+        added = []
+        for n in range(num_particles):
+            launch = self.radius + 5
+            if launch + J + 2 > self.edge:
+                # a launch site at least 2 sites away from the cluster is never on or next to it
+                if not to_edge or self.radius + 2 > self.edge:
+                    break
+                launch = min(launch, self.edge)
+            # walkers are only looked up in the maps within reach, relaunched beyond the kill radius
+            reach = min(launch + J, self.edge)
+            kill = self.kill_factor * launch if reach < self.edge else self.edge
+            position = self.__jump(center, launch)
+            while True:
+                r = dist(position, center)
+                if r > reach:
+                    if r > kill:
+                        position = self.__jump(center, launch)
+                    else:
+                        # every particle lies within self.radius of the seed
+                        position = self.__jump(position, r - self.radius - 2)
+                    continue
+                site = sum(map(mul, position, strides))
+                d = distance[site]
+                if d >= 4:
+                    if d == J:
+                        d = self.__free_radius(position, d)
+                    position = self.__jump(position, d - 2)
+                    continue
+                if any(occupied[site + offset] for offset in offsets) and (sticking >= 1 or next(uniform) < sticking):
+                    occupied[site] = 1
+                    self.__mark(position)
+                    added.append(site)
+                    break
+                k = int(next(uniform) * num_offsets)
+                if not occupied[site + offsets[k]]:
+                    position[k // 2] += 1 - 2 * (k % 2)
+        return added
@@ -0,0 +1,315 @@
+#   File: ensemble.py
+#   Author: Nawaf Abdullah
+#   Creation Date: 17/October/2026
+#   Description: Random walks of many walkers at once on 1D, 2D and 3D lattices, stored as numpy arrays
+import numpy as np
+from multiprocessing import Pool
+from randomSystems.boundaries import passage_dtype
+
+
+def step_vectors(codes, dim):
+    """
+    Decodes step codes into unit lattice steps.
+        - Code 2a is a step along +axis a and code 2a + 1 a step along -axis a
+    :param codes: integer array of step codes between 0 and 2 * dim - 1
+    :param dim: number of dimensions, 1, 2 or 3
+    :return: int8 array of shape (dim,) + codes.shape
+    """
+    steps = np.zeros((dim,) + codes.shape, dtype=np.int8)
+    for axis in range(dim):
+        steps[axis][codes == 2 * axis] = 1
+        steps[axis][codes == 2 * axis + 1] = -1
+    return steps
+
+
+def _draw_steps(rng, num_walkers, num_steps, dim, dtype=np.int64):
+    """
+    Draws random steps of a block of walkers
+    :param rng: numpy.random.Generator of the block
+    :param num_walkers: number of walkers of the block
+    :param num_steps: number of steps
+    :param dim: number of dimensions, 1, 2 or 3
+    :param dtype: integer type of the steps
+    :return: array of shape (3, num_walkers, num_steps), the time axis in 1D stepping by one
+    """
+    codes = rng.integers(0, 2 * dim, size=(num_walkers, num_steps), dtype=np.int8)
+    steps = np.zeros((3, num_walkers, num_steps), dtype=dtype)
+    steps[:dim] = step_vectors(codes, dim)
+    if dim == 1:
+        steps[1] = 1
+    return steps
+
+
+def _walk_block(job):
+    """
+    Walks a block of walkers, in a worker process or not
+    :param job: (generator, starting positions of shape (n, 3), num_steps, dim)
+    :return: int32 path of the block, the starting point alone for fewer than 2 points, and the generator,
+             advanced
+    """
+    rng, start, num_steps, dim = job
+    path = np.empty((3, len(start), max(1, num_steps)), dtype=np.int32)
+    path[:, :, 0] = start.T
+    path[:, :, 1:] = _draw_steps(rng, len(start), max(0, num_steps - 1), dim, np.int32)
+    np.cumsum(path, axis=2, out=path)
+    return path, rng
+
+
+def _stream_block(job):
+    """
+    Walks a block of walkers chunk by chunk into its own statistics, in a worker process or not
+    :param job: (generator, starting positions of shape (n, 3), num_steps, dim, empty WalkStatistics of the
+                block, chunk_size)
+    :return: statistics of the block, the generator, advanced, and the last positions of the block
+    """
+    rng, start, num_steps, dim, statistics, chunk_size = job
+    origin = start.T[:dim, :, None]
+    last = start.T[:, :, None]
+    for t0 in range(0, num_steps, chunk_size):
+        size = min(chunk_size, num_steps - t0)
+        if t0 == 0:
+            positions = np.concatenate([np.zeros_like(last), _draw_steps(rng, len(start), size - 1, dim)], axis=2)
+        else:
+            positions = _draw_steps(rng, len(start), size, dim)
+        np.cumsum(positions, axis=2, out=positions)
+        positions += last
+        last = positions[:, :, -1:].copy()
+        statistics.update(positions[:dim] - origin, t0)
+    return statistics, rng, last
+
+
+def _passage_block(job):
+    """
+    Walks a block of walkers until they are absorbed, in a worker process or not. Only the walkers still alive
+    are drawn steps for: the block shrinks after every chunk of steps
+    :param job: (generator, starting positions of shape (n, dim), max_steps, dim, boundaries, chunk_size)
+    :return: first passage results of the block (see boundaries.passage_dtype) and the generator, advanced
+    """
+    rng, start, max_steps, dim, boundaries, chunk_size = job
+    absorbing = [(index, b) for index, b in enumerate(boundaries) if b.kind == "absorbing"]
+    reflecting = [b for b in boundaries if b.kind == "reflecting"]
+    passages = np.zeros(len(start), dtype=passage_dtype(dim))
+    passages["time"] = -1
+    passages["boundary"] = -1
+
+    def absorb(trail, alive, t):
+        """ Records the first absorption of every walker along its trail, returns the walkers left alive """
+        hit = np.zeros(trail.shape[:2], dtype=bool)
+        which = np.zeros(trail.shape[:2], dtype=np.int64)
+        for index, b in reversed(absorbing):
+            h = b.hits(trail)
+            which[h] = index
+            hit |= h
+        absorbed = hit.any(axis=1)
+        step = np.argmax(hit[absorbed], axis=1)
+        rows = np.flatnonzero(absorbed)
+        passages["time"][alive[absorbed]] = t + step
+        passages["position"][alive[absorbed]] = trail[rows, step]
+        passages["boundary"][alive[absorbed]] = which[rows, step]
+        return ~absorbed
+
+    alive = np.arange(len(start))
+    position = np.array(start, dtype=np.int64)
+    keep = absorb(position[:, None], alive, 0)
+    alive, position = alive[keep], position[keep]
+    t = 0
+    while t < max_steps and alive.size:
+        size = min(chunk_size, max_steps - t)
+        codes = rng.integers(0, 2 * dim, size=(alive.size, size), dtype=np.int8)
+        steps = np.moveaxis(step_vectors(codes, dim), 0, -1).astype(np.int64)
+        if reflecting:
+            # a step into a reflecting region is turned down and the walker stays put
+            trail = np.empty_like(steps)
+            for k in range(size):
+                candidate = position + steps[:, k]
+                blocked = np.zeros(alive.size, dtype=bool)
+                for b in reflecting:
+                    blocked |= b.hits(candidate)
+                position = np.where(blocked[:, None], position, candidate)
+                trail[:, k] = position
+        else:
+            trail = position[:, None] + np.cumsum(steps, axis=1)
+        keep = absorb(trail, alive, t + 1)
+        alive, position = alive[keep], trail[keep, -1]
+        t += size
+    passages["position"][alive] = position
+    return passages, rng
+
+
+class WalkerEnsemble:
+    def __init__(self, num_walkers, dim=2, start=None, seed=None, block_size=1024):
+        """
+        Simulates many independent random walkers at once: the steps of every walker are drawn in bulk and
+        summed with numpy.
+            - Paths are stored as one int32 array of shape (3, num_walkers, num_points), as in Walker, so self.x,
+              self.y and self.z are (num_walkers, num_points) views, row n holding the same list as the x, y, z
+              of a Walker
+            - In 1D, as in Walker.walk_1d, self.y is the time axis
+            - Walkers are split into blocks of block_size walkers, each drawing from its own generator spawned
+              from numpy.random.SeedSequence(seed). Blocks are walked independently, in a pool of processes
+              with workers=N, and the results are bitwise the same whatever the number of workers
+        :param num_walkers: number of walkers
+        :param dim: number of dimensions, 1, 2 or 3
+        :param start: starting positions, array of shape (num_walkers, 3) or (3,), the origin by default
+        :param seed: seed (or numpy.random.SeedSequence) of the random steps, None for a fresh one
+        :param block_size: number of walkers sharing a generator, 1 for one stream per walker
+        """
+        if dim not in (1, 2, 3):
+            raise ValueError("Dimension must be 1, 2 or 3")
+        self.num_walkers = num_walkers
+        self.dim = dim
+        self.start = np.zeros((num_walkers, 3), dtype=np.int64)
+        if start is not None:
+            self.start[...] = start
+        self.path = self.start.T[:, :, None].astype(np.int32)
+        self.blocks = [(first, min(first + block_size, num_walkers)) for first in range(0, num_walkers, block_size)]
+        sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.generators = [np.random.default_rng(child) for child in sequence.spawn(len(self.blocks))]
+
+    @classmethod
+    def from_walkers(cls, walkers, dim=2, seed=None, block_size=1024):
+        """
+        Builds an ensemble starting from the positions of Walker instances (Walker.position)
+        :param walkers: list of Walker instances
+        :param dim: number of dimensions, 1, 2 or 3
+        :param seed: seed (or numpy.random.SeedSequence) of the random steps, None for a fresh one
+        :param block_size: number of walkers sharing a generator, 1 for one stream per walker
+        """
+        start = [w.position for w in walkers]
+        return cls(len(walkers), dim, start, seed, block_size)
+
+    @property
+    def x(self):
+        return self.path[0]
+
+    @property
+    def y(self):
+        return self.path[1]
+
+    @property
+    def z(self):
+        return self.path[2]
+
+    def __map(self, function, jobs, workers):
+        """
+        Runs the jobs of the blocks in order, in a pool of processes when workers is set
+        """
+        if workers is None or workers <= 1 or len(jobs) <= 1:
+            return [function(job) for job in jobs]
+        with Pool(min(workers, len(jobs))) as pool:
+            return pool.map(function, jobs)
+
+    def __steps(self, num_steps):
+        """
+        Draws num_steps random steps of every walker, block by block
+        :return: int64 array of shape (3, num_walkers, num_steps)
+        """
+        return np.concatenate([_draw_steps(rng, last - first, num_steps, self.dim)
+                               for rng, (first, last) in zip(self.generators, self.blocks)], axis=1)
+
+    def walk(self, num_steps, workers=None):
+        """
+        Calculates the paths of every walker, starting again from self.start
+        :param num_steps: number of points of every path, the starting point included as in Walker.walk_*. With
+                          fewer than 2 points, the paths only hold the starting points
+        :param workers: number of processes walking the blocks, None to walk them in this process
+        :return: the paths self.x, self.y (and self.z in 3D)
+        """
+        jobs = [(rng, self.start[first:last], num_steps, self.dim)
+                for rng, (first, last) in zip(self.generators, self.blocks)]
+        results = self.__map(_walk_block, jobs, workers)
+        self.generators = [rng for path, rng in results]
+        self.path = np.concatenate([path for path, rng in results], axis=1)
+        if self.dim == 3:
+            return self.x, self.y, self.z
+        return self.x, self.y
+
+    def chunks(self, num_steps, chunk_size=None):
+        """
+        Generates the paths of every walker a chunk of steps at a time, without ever holding a whole path.
+            - Every chunk carries on from the last positions of the previous one, and self.path only keeps
+              the last positions once the walk is over
+        :param num_steps: number of points of every path, the starting point included
+        :param chunk_size: number of points per chunk, by default about a million positions per chunk
+        :return: generator of (t0, positions), positions being an array of shape (3, num_walkers, T) holding
+                 the points t0 to t0 + T - 1 of the paths
+        """
+        if chunk_size is None:
+            chunk_size = max(1, 2 ** 20 // self.num_walkers)
+        last = self.start.T[:, :, None]
+        for t0 in range(0, num_steps, chunk_size):
+            size = min(chunk_size, num_steps - t0)
+            if t0 == 0:
+                positions = np.concatenate([np.zeros_like(last), self.__steps(size - 1)], axis=2)
+            else:
+                positions = self.__steps(size)
+            np.cumsum(positions, axis=2, out=positions)
+            positions += last
+            last = positions[:, :, -1:].copy()
+            self.path = last.astype(np.int32)
+            yield t0, positions
+
+    def stream(self, num_steps, statistics, chunk_size=None, workers=None):
+        """
+        Walks every walker num_steps steps feeding the displacements to a streaming accumulator chunk by chunk,
+        in constant memory per walker.
+            - Every block of walkers is accumulated on its own and the blocks are merged in order, so the
+              statistics are bitwise the same whatever the number of workers
+        :param num_steps: number of points of every path, the starting point included
+        :param statistics: WalkStatistics instance, updated in place
+        :param chunk_size: number of points per chunk, by default about a million positions per block and chunk
+        :param workers: number of processes walking the blocks, None to walk them in this process
+        :return: statistics
+        """
+        if chunk_size is None:
+            chunk_size = max(1, 2 ** 20 // (self.blocks[0][1] - self.blocks[0][0]))
+        jobs = [(rng, self.start[first:last], num_steps, self.dim, statistics.spawn(last - first), chunk_size)
+                for rng, (first, last) in zip(self.generators, self.blocks)]
+        results = self.__map(_stream_block, jobs, workers)
+        for (block, rng, last), (first, end) in zip(results, self.blocks):
+            statistics.merge(block, first)
+        self.generators = [rng for block, rng, last in results]
+        self.path = np.concatenate([last for block, rng, last in results], axis=1).astype(np.int32)
+        return statistics
+
+    def first_passage(self, max_steps, boundaries, chunk_size=256, workers=None):
+        """
+        Walks every walker from self.start until it is absorbed by a boundary, or for max_steps steps.
+            - Absorbed walkers are retired after every chunk of steps, so the work follows the walkers still alive
+            - Walks are not stored, only the first passage of every walker
+        :param max_steps: largest number of steps of a walker
+        :param boundaries: list of boundaries (Box, Sphere, Mask of randomSystems.boundaries), absorbing or
+                           reflecting. A walker absorbed by two boundaries at once counts for the first one listed
+        :param chunk_size: number of steps drawn at a time for the walkers still alive
+        :param workers: number of processes walking the blocks, None to walk them in this process
+        :return: structured array of (time, position, boundary) for every walker, see boundaries.passage_dtype
+        """
+        jobs = [(rng, self.start[first:last, :self.dim], max_steps, self.dim, boundaries, chunk_size)
+                for rng, (first, last) in zip(self.generators, self.blocks)]
+        results = self.__map(_passage_block, jobs, workers)
+        self.generators = [rng for passages, rng in results]
+        return np.concatenate([passages for passages, rng in results])
+
+    def displacement(self):
+        """
+        Squared distance of every walker from its starting point at every step, the time axis excluded in 1D
+        :return: array of shape (num_walkers, num_points)
+        """
+        delta = self.path[:self.dim] - self.start.T[:self.dim, :, None]
+        return np.sum(delta.astype(np.float64) ** 2, axis=0)
+
+    def mean_squared_displacement(self):
+        """
+        Mean squared displacement of the walkers vs. step number, 2 * dim * D * t for a diffusion coefficient D
+        :return: array of num_points values
+        """
+        return self.displacement().mean(axis=0)
+
+    def to_walkers(self, walkers):
+        """
+        Appends the paths of the ensemble to Walker instances, as if they had walked them themselves
+        :param walkers: list of num_walkers Walker instances
+        """
+        for n, w in enumerate(walkers):
+            w.extend(self.path[:, n, 1:])
+            w.z_switch = self.dim == 3
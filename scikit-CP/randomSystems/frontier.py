@@ -0,0 +1,75 @@
+#   File: frontier.py
+#   Author: Nawaf Abdullah
+#   Creation Date: 17/October/2026
+#   Description: Set with constant time insertion, removal and uniform random selection, for growth frontiers
+
+
+class IndexedSet:
+    __slots__ = ("items", "index")
+
+    def __init__(self, items=()):
+        """
+        Set of hashable items kept in a list, with a dictionary of item -> position in the list.
+            - A removed item is swapped with the last one of the list, so insertion, removal, membership and
+              uniform random selection all take O(1) time
+        :param items: initial items
+        """
+        self.items = []
+        self.index = {}
+        for item in items:
+            self.add(item)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, item):
+        return item in self.index
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def add(self, item):
+        """
+        Adds an item, if not in the set yet
+        """
+        if item not in self.index:
+            self.index[item] = len(self.items)
+            self.items.append(item)
+
+    def remove(self, item):
+        """
+        Removes an item, raises KeyError if it is not in the set
+        """
+        i = self.index.pop(item)
+        last = self.items.pop()
+        if i < len(self.items):
+            self.items[i] = last
+            self.index[last] = i
+
+    def discard(self, item):
+        """
+        Removes an item if it is in the set
+        """
+        if item in self.index:
+            self.remove(item)
+
+    def choice(self, u):
+        """
+        Item picked uniformly at random
+        :param u: uniform random number in [0, 1)
+        """
+        return self.items[int(u * len(self.items))]
+
+    def pop_random(self, u):
+        """
+        Removes and returns an item picked uniformly at random
+        :param u: uniform random number in [0, 1)
+        """
+        i = int(u * len(self.items))
+        item = self.items[i]
+        last = self.items.pop()
+        if i < len(self.items):
+            self.items[i] = last
+            self.index[last] = i
+        del self.index[item]
+        return item
@@ -0,0 +1,134 @@
+#   File: morphology.py
+#   Author: Nawaf Abdullah
+#   Creation Date: 17/October/2026
+#   Description: Shape statistics of growing clusters, updated as particles attach
+import numpy as np
+from randomSystems.saw import SiteTable, site_keys
+
+
+class ClusterMorphology:
+    def __init__(self, dim, origin, bin_width=1.0, num_levels=12):
+        """
+        Running statistics of the shape of a cluster, updated with every batch of new particles so they can be
+        read at any time without going over the whole cluster again.
+            - Center of mass and radius of gyration from integer sums of the positions and of their squares,
+              taken relative to the origin so they stay exact
+            - Mass in shells around the origin, the histogram of the mass-radius relation
+            - Box-count pyramid: the number of occupied boxes of side 1, 2, 4... 2^(num_levels - 1). Every level
+              keeps its occupied boxes in a SiteTable, and only the boxes new at one level are looked up at the
+              next, so an update costs O(1) per particle on average
+        :param dim: number of dimensions, 2 or 3
+        :param origin: coordinates of the first seed particle, the center of the shells
+        :param bin_width: width of the shells, in lattice units
+        :param num_levels: number of box sizes of the pyramid
+        """
+        self.dim = dim
+        self.origin = np.asarray(origin, dtype=np.int64)
+        self.bin_width = bin_width
+        self.count = 0
+        self.sum = np.zeros(dim, dtype=np.int64)
+        self.sum_squares = 0
+        self.radial = np.zeros(0, dtype=np.int64)
+        self.boxes = [SiteTable() for level in range(num_levels)]
+        self.lower = None
+        self.upper = None
+
+    def __len__(self):
+        return self.count
+
+    def update(self, sites):
+        """
+        Adds new particles to the statistics
+        :param sites: integer array of shape (num_sites, dim) of sites not in the cluster yet
+        """
+        sites = np.asarray(sites, dtype=np.int64).reshape(-1, self.dim)
+        if not len(sites):
+            return
+        relative = sites - self.origin
+        self.count += len(sites)
+        self.sum += relative.sum(axis=0)
+        self.sum_squares += int(np.sum(relative ** 2))
+        shells = (np.sqrt(np.sum(relative ** 2, axis=1)) / self.bin_width).astype(np.int64)
+        counts = np.bincount(shells)
+        if counts.size > self.radial.size:
+            self.radial = np.append(self.radial, np.zeros(counts.size - self.radial.size, dtype=np.int64))
+        self.radial[:counts.size] += counts
+        lower, upper = sites.min(axis=0), sites.max(axis=0)
+        self.lower = lower if self.lower is None else np.minimum(self.lower, lower)
+        self.upper = upper if self.upper is None else np.maximum(self.upper, upper)
+
+        boxes = relative
+        for level, table in enumerate(self.boxes):
+            if level:
+                boxes = boxes >> 1
+            keys, first = np.unique(site_keys(boxes), return_index=True)
+            new = table.find(keys) < 0
+            if not new.any():
+                break
+            table.insert(keys[new], 0)
+            # boxes already occupied at this level are occupied at the coarser ones too
+            boxes = boxes[first[new]]
+
+    def center_of_mass(self):
+        """
+        Coordinates of the center of mass
+        """
+        return self.origin + self.sum / max(1, self.count)
+
+    def radius_of_gyration(self):
+        """
+        Radius of gyration, the root mean square distance of the particles from their center of mass
+        """
+        if not self.count:
+            return 0.0
+        mean = self.sum / self.count
+        return float(np.sqrt(max(0.0, self.sum_squares / self.count - np.dot(mean, mean))))
+
+    def radial_mass(self):
+        """
+        Number of particles in shells around the origin
+        :return: inner radii of the shells and counts
+        """
+        return np.arange(self.radial.size) * self.bin_width, self.radial.copy()
+
+    def mass_radius(self):
+        """
+        Mass within a distance of the origin
+        :return: radii (outer radii of the shells) and number of particles within them
+        """
+        return (np.arange(self.radial.size) + 1) * self.bin_width, np.cumsum(self.radial)
+
+    def mass_radius_dimension(self, r_min=None, r_max=None):
+        """
+        Fractal dimension from a least squares fit of log M(r) vs. log r
+        :param r_min: smallest radius of the fit, 4 bins by default
+        :param r_max: largest radius of the fit, half the radius of the cluster by default
+        """
+        r, mass = self.mass_radius()
+        r_min = 4 * self.bin_width if r_min is None else r_min
+        r_max = r[-1] / 2 if r_max is None else r_max
+        fit = (r >= r_min) & (r <= r_max)
+        if np.sum(fit) < 2:
+            return np.nan
+        return float(np.polyfit(np.log(r[fit]), np.log(mass[fit]), 1)[0])
+
+    def box_counts(self):
+        """
+        Number of occupied boxes of every size of the pyramid
+        :return: box sizes and counts
+        """
+        return 2 ** np.arange(len(self.boxes)), np.array([len(table) for table in self.boxes])
+
+    def box_counting_dimension(self, min_size=2, max_size=None):
+        """
+        Fractal dimension from a least squares fit of log N(s) vs. log(1 / s)
+        :param min_size: smallest box size of the fit
+        :param max_size: largest box size of the fit, a quarter of the extent of the cluster by default
+        """
+        sizes, counts = self.box_counts()
+        if max_size is None:
+            max_size = 0 if self.lower is None else np.max(self.upper - self.lower + 1) / 4
+        fit = (sizes >= min_size) & (sizes <= max_size)
+        if np.sum(fit) < 2:
+            return np.nan
+        return float(-np.polyfit(np.log(sizes[fit]), np.log(counts[fit]), 1)[0])
@@ -0,0 +1,208 @@
+#   File: occupancy.py
+#   Author: Nawaf Abdullah
+#   Creation Date: 17/October/2026
+#   Description: Occupancy grids of lattice clusters, dense or made of tiles allocated on demand
+import numpy as np
+
+
+def _as_sites(sites, dim):
+    return np.asarray(sites, dtype=np.int64).reshape(-1, dim)
+
+
+def _occupy(cells, flat):
+    """
+    Occupies cells of a flat uint8 array
+    :param cells: flat array
+    :param flat: indices of the cells, possibly repeated
+    :return: number of cells that were empty
+    """
+    new = np.unique(flat[cells[flat] == 0]).size
+    cells[flat] = 1
+    return new
+
+
+class DenseGrid:
+    def __init__(self, shape):
+        """
+        Occupancy of every site of a box, one byte per site
+        :param shape: number of sites along every axis, the sites go from 0 to shape - 1
+        """
+        self.shape = tuple(int(n) for n in shape)
+        self.dim = len(self.shape)
+        self.grid = np.zeros(self.shape, dtype=np.uint8)
+        self.count = 0
+        self.lower = None
+        self.upper = None
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def nbytes(self):
+        return self.grid.nbytes
+
+    def __inside(self, sites):
+        return np.all((sites >= 0) & (sites < self.shape), axis=1)
+
+    def add(self, sites):
+        """
+        Occupies sites
+        :param sites: integer array of shape (num_sites, dim)
+        """
+        sites = _as_sites(sites, self.dim)
+        if not np.all(self.__inside(sites)):
+            raise ValueError("Sites outside of the grid")
+        if not len(sites):
+            return
+        self.count += _occupy(self.grid.reshape(-1), np.ravel_multi_index(tuple(sites.T), self.shape))
+        lower, upper = sites.min(axis=0), sites.max(axis=0)
+        self.lower = lower if self.lower is None else np.minimum(self.lower, lower)
+        self.upper = upper if self.upper is None else np.maximum(self.upper, upper)
+
+    def contains(self, sites):
+        """
+        :param sites: integer array of shape (num_sites, dim)
+        :return: boolean array, True on the occupied sites (sites outside of the grid are empty)
+        """
+        sites = _as_sites(sites, self.dim)
+        inside = self.__inside(sites)
+        found = np.zeros(len(sites), dtype=bool)
+        found[inside] = self.grid[tuple(sites[inside].T)] == 1
+        return found
+
+    def bounds(self):
+        """
+        Lowest and highest coordinates of the occupied sites, None when the grid is empty
+        """
+        if self.lower is None:
+            return None
+        return self.lower.copy(), self.upper.copy()
+
+    def to_dense(self, lower=None, upper=None):
+        """
+        Occupancy of a box of sites as an array
+        :param lower: lowest coordinates of the box, the origin by default
+        :param upper: highest coordinates of the box, the far corner of the grid by default
+        :return: uint8 array, the grid itself when the box is the whole grid
+        """
+        lower = np.zeros(self.dim, dtype=np.int64) if lower is None else np.asarray(lower, dtype=np.int64)
+        upper = np.array(self.shape) - 1 if upper is None else np.asarray(upper, dtype=np.int64)
+        if np.all(lower == 0) and np.all(upper == np.array(self.shape) - 1):
+            return self.grid
+        dense = np.zeros(tuple(upper - lower + 1), dtype=np.uint8)
+        lo, hi = np.maximum(lower, 0), np.minimum(upper + 1, self.shape)
+        if np.all(hi > lo):
+            dense[tuple(slice(a, b) for a, b in zip(lo - lower, hi - lower))] = \
+                self.grid[tuple(slice(a, b) for a, b in zip(lo, hi))]
+        return dense
+
+
+class TiledGrid:
+    def __init__(self, dim, tile_size=32, shape=None):
+        """
+        Occupancy of sites held in cubic tiles, allocated the first time a site of theirs is occupied, so memory
+        follows the cluster rather than the space it grows in.
+            - Tiles are uint8 arrays of tile_size^dim sites, stored in a dictionary by tile coordinates
+            - Coordinates may be negative
+        :param dim: number of dimensions
+        :param tile_size: number of sites along every side of a tile
+        :param shape: sites allowed, from 0 to shape - 1 along every axis, None for no limit
+        """
+        self.dim = dim
+        self.tile_size = tile_size
+        self.shape = None if shape is None else tuple(int(n) for n in shape)
+        self.tiles = dict()
+        self.count = 0
+        self.lower = None
+        self.upper = None
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def nbytes(self):
+        return len(self.tiles) * self.tile_size ** self.dim
+
+    def __split(self, sites):
+        """
+        Groups sites by tile
+        :return: list of tile coordinates, and for every tile the local coordinates of its sites and their rows
+        """
+        tiles, local = np.divmod(sites, self.tile_size)
+        # tiles numbered within the box of the tiles of the batch
+        first = tiles.min(axis=0)
+        numbers = np.ravel_multi_index(tuple((tiles - first).T), tuple(tiles.max(axis=0) - first + 1))
+        numbers, inverse = np.unique(numbers, return_inverse=True)
+        order = np.argsort(inverse, kind="stable")
+        ends = np.cumsum(np.bincount(inverse, minlength=len(numbers)))
+        groups = np.split(order, ends[:-1])
+        keys = tiles[order[ends - 1]]
+        return [tuple(key) for key in keys.tolist()], local, groups
+
+    def add(self, sites):
+        """
+        Occupies sites
+        :param sites: integer array of shape (num_sites, dim)
+        """
+        sites = _as_sites(sites, self.dim)
+        if self.shape is not None and not np.all((sites >= 0) & (sites < self.shape)):
+            raise ValueError("Sites outside of the grid")
+        if not len(sites):
+            return
+        keys, local, groups = self.__split(sites)
+        shape = (self.tile_size,) * self.dim
+        for key, rows in zip(keys, groups):
+            tile = self.tiles.get(key)
+            if tile is None:
+                tile = self.tiles[key] = np.zeros(shape, dtype=np.uint8)
+            self.count += _occupy(tile.reshape(-1), np.ravel_multi_index(tuple(local[rows].T), shape))
+        lower, upper = sites.min(axis=0), sites.max(axis=0)
+        self.lower = lower if self.lower is None else np.minimum(self.lower, lower)
+        self.upper = upper if self.upper is None else np.maximum(self.upper, upper)
+
+    def contains(self, sites):
+        """
+        :param sites: integer array of shape (num_sites, dim)
+        :return: boolean array, True on the occupied sites
+        """
+        sites = _as_sites(sites, self.dim)
+        found = np.zeros(len(sites), dtype=bool)
+        if not len(sites):
+            return found
+        keys, local, groups = self.__split(sites)
+        for key, rows in zip(keys, groups):
+            tile = self.tiles.get(key)
+            if tile is not None:
+                found[rows] = tile[tuple(local[rows].T)] == 1
+        return found
+
+    def bounds(self):
+        """
+        Lowest and highest coordinates of the occupied sites, None when the grid is empty
+        """
+        if self.lower is None:
+            return None
+        return self.lower.copy(), self.upper.copy()
+
+    def to_dense(self, lower=None, upper=None):
+        """
+        Occupancy of a box of sites as an array, only touching the tiles that overlap it
+        :param lower: lowest coordinates of the box, those of the occupied sites by default
+        :param upper: highest coordinates of the box, those of the occupied sites by default
+        :return: uint8 array
+        """
+        if lower is None or upper is None:
+            if self.lower is None:
+                return np.zeros((0,) * self.dim, dtype=np.uint8)
+            lower = self.lower if lower is None else lower
+            upper = self.upper if upper is None else upper
+        lower, upper = np.asarray(lower, dtype=np.int64), np.asarray(upper, dtype=np.int64)
+        dense = np.zeros(tuple(upper - lower + 1), dtype=np.uint8)
+        T = self.tile_size
+        for key, tile in self.tiles.items():
+            start = np.array(key) * T
+            lo, hi = np.maximum(lower, start), np.minimum(upper + 1, start + T)
+            if np.all(hi > lo):
+                dense[tuple(slice(a, b) for a, b in zip(lo - lower, hi - lower))] = \
+                    tile[tuple(slice(a, b) for a, b in zip(lo - start, hi - start))]
+        return dense
@@ -0,0 +1,323 @@
+#   File: saw.py
+#   Author: Nawaf Abdullah
+#   Creation Date: 17/October/2026
+#   Description: Long self avoiding walks with the pivot algorithm and Rosenbluth chain growth
+import numpy as np
+from itertools import permutations, product
+
+
+def lattice_symmetries(dim):
+    """
+    Orthogonal matrices of the symmetries of the square (2D) or cubic (3D) lattice, the identity excluded
+    :param dim: number of dimensions, 2 or 3
+    :return: int64 array of shape (num_symmetries, dim, dim), 7 matrices in 2D and 47 in 3D
+    """
+    matrices = []
+    for order in permutations(range(dim)):
+        for signs in product((1, -1), repeat=dim):
+            g = np.zeros((dim, dim), dtype=np.int64)
+            g[np.arange(dim), order] = signs
+            if not np.array_equal(g, np.eye(dim, dtype=np.int64)):
+                matrices.append(g)
+    return np.array(matrices)
+
+
+def neighbours(dim):
+    """
+    Unit steps of the square or cubic lattice
+    :param dim: number of dimensions, 2 or 3
+    :return: int64 array of shape (2 * dim, dim)
+    """
+    steps = np.zeros((2 * dim, dim), dtype=np.int64)
+    for axis in range(dim):
+        steps[2 * axis, axis] = 1
+        steps[2 * axis + 1, axis] = -1
+    return steps
+
+
+def site_keys(sites):
+    """
+    Packs lattice sites into single integers, the keys of the occupancy tables.
+        - Coordinates must stay within +/- 2^20 in 3D and 2^30 in 2D
+    :param sites: integer array of shape (num_sites, dim)
+    :return: int64 array of non negative keys
+    """
+    sites = np.asarray(sites, dtype=np.int64)
+    bits = 63 // sites.shape[1]
+    keys = np.zeros(len(sites), dtype=np.int64)
+    for axis in range(sites.shape[1]):
+        keys = (keys << bits) + (sites[:, axis] + (1 << (bits - 1)))
+    return keys
+
+
+class SiteTable:
+    EMPTY = -1
+    DELETED = -2
+
+    def __init__(self, capacity=1024):
+        """
+        Hash table of non negative int64 keys (packed lattice sites, see site_keys) to int64 values, with every
+        operation applied to a whole array of keys at once.
+            - Open addressing with linear probing: all the keys of a batch probe together, one numpy step per
+              probe, and the table stays at most half full so a lookup takes O(1) probes on average
+            - Deleted keys leave a marker behind, cleared when the table is rebuilt
+        :param capacity: number of keys the table is first sized for
+        """
+        self.count = 0
+        self.__allocate(capacity)
+
+    def __allocate(self, capacity):
+        size = 16
+        while size < 2 * capacity:
+            size *= 2
+        self.keys = np.full(size, self.EMPTY, dtype=np.int64)
+        self.values = np.zeros(size, dtype=np.int64)
+        self.used = 0
+        self.__shift = np.uint64(64 - size.bit_length() + 1)
+
+    def __len__(self):
+        return self.count
+
+    def __hash(self, keys):
+        # Fibonacci hashing: the top bits of the key times 2^64 / golden ratio
+        with np.errstate(over="ignore"):
+            product = keys.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+        return (product >> self.__shift).astype(np.int64)
+
+    def find(self, keys):
+        """
+        Slots of keys in the table
+        :param keys: int64 array
+        :return: int64 array of slots, -1 for the missing keys
+        """
+        keys = np.asarray(keys, dtype=np.int64)
+        mask = len(self.keys) - 1
+        slot = self.__hash(keys)
+        found = np.full(len(keys), -1, dtype=np.int64)
+        pending = np.arange(len(keys))
+        while pending.size:
+            stored = self.keys[slot]
+            hit = stored == keys
+            found[pending[hit]] = slot[hit]
+            going = ~hit & (stored != self.EMPTY)
+            pending, keys, slot = pending[going], keys[going], (slot[going] + 1) & mask
+        return found
+
+    def get(self, keys, default=-1):
+        """
+        Values of keys
+        :param keys: int64 array
+        :param default: value of the missing keys
+        :return: int64 array
+        """
+        slot = self.find(keys)
+        return np.where(slot >= 0, self.values[slot], default)
+
+    def insert(self, keys, values):
+        """
+        Adds keys that are not in the table yet
+        :param keys: int64 array of distinct keys missing from the table
+        :param values: int64 array of their values
+        """
+        keys = np.asarray(keys, dtype=np.int64)
+        values = np.broadcast_to(np.asarray(values, dtype=np.int64), keys.shape)
+        if 2 * (self.used + len(keys)) > len(self.keys):
+            # room for as many keys again, so that the deleted markers pile up for a while before the next rebuild
+            self.__rebuild(2 * (self.count + len(keys)))
+        mask = len(self.keys) - 1
+        slot = self.__hash(keys)
+        pending = np.arange(len(keys))
+        while pending.size:
+            free = self.keys[slot[pending]] < 0
+            candidates = pending[free]
+            slots = slot[candidates]
+            empty = self.keys[slots] == self.EMPTY
+            # keys of the batch landing on the same free slot: one write wins, the others probe on
+            self.keys[slots] = keys[candidates]
+            won = self.keys[slots] == keys[candidates]
+            self.used += int(np.sum(empty & won))
+            self.values[slots[won]] = values[candidates[won]]
+            placed = np.zeros(len(pending), dtype=bool)
+            placed[np.flatnonzero(free)[won]] = True
+            pending = pending[~placed]
+            slot[pending] = (slot[pending] + 1) & mask
+        self.count += len(keys)
+
+    def delete(self, keys):
+        """
+        Removes keys that are in the table
+        :param keys: int64 array of distinct keys
+        """
+        slot = self.find(keys)
+        slot = slot[slot >= 0]
+        self.keys[slot] = self.DELETED
+        self.count -= len(slot)
+        # a marker followed by an empty slot ends no probe sequence, it can be emptied as well
+        mask = len(self.keys) - 1
+        while slot.size:
+            last = self.keys[(slot + 1) & mask] == self.EMPTY
+            self.keys[slot[last]] = self.EMPTY
+            self.used -= int(np.sum(last))
+            slot = slot[~last]
+            slot = slot[self.keys[(slot + 1) & mask] == self.EMPTY]
+
+    def __rebuild(self, capacity):
+        keys = self.keys[self.keys >= 0]
+        values = self.values[self.keys >= 0]
+        self.__allocate(capacity)
+        self.count = 0
+        self.insert(keys, values)
+
+
+class PivotSAW:
+    def __init__(self, num_steps, dim=2, seed=None):
+        """
+        Self avoiding walk sampled with the pivot algorithm (Madras and Sokal).
+            - A pivot move picks a site of the chain and a random lattice symmetry, and applies it to the
+              shorter side of the chain around that site. The move is kept only if the chain stays self
+              avoiding, which leaves the uniform distribution over self avoiding walks invariant
+            - The occupied sites are held in a hash table of site -> index along the chain (SiteTable), so the
+              collision check costs O(1) per moved site and usually stops after a few sites when the move fails
+            - An accepted move still rewrites the table entries and the positions of the whole moved side, up to
+              N / 2 sites, so it costs O(N): about 2 ms at N = 10^4, 10 ms at 10^5 and 0.1 s at 10^6 on one
+              core. Sampling is practical up to about 10^5 steps; at 10^6 steps only about ten moves are
+              accepted per second. Faster moves on longer chains need a representation transformed lazily,
+              such as the SAW-tree of Clisby, which this class does not implement
+            - The chain starts as a straight rod, which needs a few thousand accepted moves to forget
+        :param num_steps: number of steps of the walk
+        :param dim: number of dimensions, 2 or 3
+        :param seed: seed or numpy.random.Generator of the moves
+        """
+        if dim not in (2, 3):
+            raise ValueError("Dimension must be 2 or 3")
+        self.num_steps = num_steps
+        self.dim = dim
+        self.rng = np.random.default_rng(seed)
+        self.symmetries = lattice_symmetries(dim)
+        self.chain = np.zeros((num_steps + 1, dim), dtype=np.int64)
+        self.chain[:, 0] = np.arange(num_steps + 1)
+        self.occupied = SiteTable(num_steps + 1)
+        self.occupied.insert(site_keys(self.chain), np.arange(num_steps + 1))
+        self.attempts = 0
+        self.accepted = 0
+
+    def pivot(self, num_attempts):
+        """
+        Attempts pivot moves
+        :param num_attempts: number of attempted moves
+        :return: number of accepted moves
+        """
+        N = self.num_steps
+        if N < 2:
+            return 0
+        pivots = self.rng.integers(1, N, size=num_attempts)
+        choices = self.rng.integers(0, len(self.symmetries), size=num_attempts)
+        accepted = 0
+        for k, g in zip(pivots.tolist(), choices.tolist()):
+            moved = self.__move(k, self.symmetries[g].T)
+            if moved is None:
+                continue
+            for lo, hi, new, keys in moved:
+                self.occupied.delete(site_keys(self.chain[lo:hi]))
+            for lo, hi, new, keys in moved:
+                self.occupied.insert(keys, np.arange(lo, hi))
+                self.chain[lo:hi] = new
+            accepted += 1
+        self.attempts += num_attempts
+        self.accepted += accepted
+        return accepted
+
+    def __move(self, k, G):
+        """
+        Applies a symmetry to the shorter side of the chain around a pivot, in blocks of sites growing by four
+        from the pivot outwards, and checks every block against the side that stays put before computing the
+        next one, so that a failed move usually costs a few sites only
+        :param k: index of the pivot
+        :param G: transposed symmetry matrix
+        :return: list of (lo, hi, new sites, keys of the new sites) of the moved blocks, None on a collision
+        """
+        head = k <= self.num_steps // 2
+        origin = self.chain[k]
+        moved = []
+        size = 16
+        lo = hi = k if head else k + 1
+        while (lo > 0) if head else (hi <= self.num_steps):
+            if head:
+                lo, hi = max(0, lo - size), lo
+            else:
+                lo, hi = hi, min(self.num_steps + 1, hi + size)
+            new = origin + (self.chain[lo:hi] - origin) @ G
+            keys = site_keys(new)
+            index = self.occupied.get(keys)
+            if head:
+                collision = np.any(index >= k)
+            else:
+                collision = np.any((index >= 0) & (index <= k))
+            if collision:
+                return None
+            moved.append((lo, hi, new, keys))
+            size *= 4
+        return moved
+
+    def end_to_end(self):
+        """
+        Squared end-to-end distance of the chain
+        """
+        delta = self.chain[-1] - self.chain[0]
+        return int(np.dot(delta, delta))
+
+    def radius_of_gyration(self):
+        """
+        Squared radius of gyration of the chain
+        """
+        return float(np.sum(np.var(self.chain, axis=0)))
+
+    def is_self_avoiding(self):
+        """
+        Checks the whole chain: unit steps and no site visited twice
+        """
+        steps = np.abs(np.diff(self.chain, axis=0)).sum(axis=1)
+        return bool(np.all(steps == 1)) and np.unique(site_keys(self.chain)).size == len(self.chain)
+
+
+def rosenbluth_chain(num_steps, dim=2, rng=None):
+    """
+    Grows a self avoiding walk one step at a time onto a uniformly chosen free neighbour (Rosenbluth and
+    Rosenbluth). The bias of the growth is undone by the weight of the chain, the product of the numbers of
+    free neighbours met along the way
+    :param num_steps: number of steps of the walk
+    :param dim: number of dimensions, 2 or 3
+    :param rng: numpy.random.Generator, or seed
+    :return: chain as an array of shape (n + 1, dim) and the log of its weight, -inf when the chain got
+             trapped before num_steps steps (it is then shorter)
+    """
+    rng = np.random.default_rng(rng)
+    steps = neighbours(dim).tolist()
+    site = (0,) * dim
+    chain = [site]
+    occupied = {site}
+    log_weight = 0.0
+    u = rng.random(num_steps).tolist()
+    for n in range(num_steps):
+        free = [s for s in (tuple(a + b for a, b in zip(site, step)) for step in steps) if s not in occupied]
+        if not free:
+            return np.array(chain, dtype=np.int64), -np.inf
+        log_weight += np.log(len(free))
+        site = free[int(u[n] * len(free))]
+        occupied.add(site)
+        chain.append(site)
+    return np.array(chain, dtype=np.int64), log_weight
+
+
+def rosenbluth_average(values, log_weights):
+    """
+    Rosenbluth weighted average of an observable over grown chains
+    :param values: observable of every chain
+    :param log_weights: log of the weight of every chain
+    :return: weighted average, nan when every chain got trapped
+    """
+    log_weights = np.asarray(log_weights, dtype=np.float64)
+    if not np.isfinite(log_weights).any():
+        return np.nan
+    w = np.exp(log_weights - log_weights[np.isfinite(log_weights)].max())
+    return float(np.sum(w * np.asarray(values)) / np.sum(w))
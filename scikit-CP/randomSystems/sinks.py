@@ -0,0 +1,78 @@
+#   File: sinks.py
+#   Author: Nawaf Abdullah
+#   Creation Date: 17/October/2026
+#   Description: Sinks consuming random walks chunk by chunk, to process walks too long to hold in memory
+import numpy as np
+
+
+class StatisticsSink:
+    def __init__(self, statistics, start, dim=2):
+        """
+        Feeds the chunks of a walk to streaming statistics
+        :param statistics: WalkStatistics instance, updated in place
+        :param start: starting positions of the walkers, array of shape (num_walkers, 3) or (3,)
+        :param dim: number of dimensions of the walk, 1, 2 or 3
+        """
+        self.statistics = statistics
+        self.dim = dim
+        self.origin = np.atleast_2d(np.asarray(start, dtype=np.int64)).T[:dim, :, None]
+
+    def write(self, t0, positions):
+        """
+        :param t0: step number of the first point of the chunk
+        :param positions: array of shape (3, num_walkers, T) of positions
+        """
+        self.statistics.update(positions[:self.dim] - self.origin, t0)
+
+    def close(self):
+        pass
+
+
+class NpyWriter:
+    def __init__(self, filename, num_walkers, num_steps, dtype=np.int32):
+        """
+        Writes the chunks of a walk into a .npy file of shape (3, num_walkers, num_steps) mapped in memory, so
+        that only the pages being written are held in RAM. The file can be opened again with
+        numpy.load(filename, mmap_mode="r")
+        :param filename: path of the .npy file
+        :param num_walkers: number of walkers
+        :param num_steps: number of points of every walk
+        :param dtype: integer type of the coordinates in the file
+        """
+        self.filename = filename
+        self.array = np.lib.format.open_memmap(filename, mode="w+", dtype=dtype, shape=(3, num_walkers, num_steps))
+
+    def write(self, t0, positions):
+        """
+        :param t0: step number of the first point of the chunk
+        :param positions: array of shape (3, num_walkers, T) of positions
+        """
+        self.array[:, :, t0:t0 + positions.shape[2]] = positions
+        # hands the written pages over to the operating system, so memory stays flat
+        self.array.flush()
+
+    def close(self):
+        """
+        Flushes and closes the file
+        """
+        self.array.flush()
+        del self.array
+
+
+def feed(chunks, *sinks):
+    """
+    Feeds every chunk of a walk to every sink, then closes the sinks
+    :param chunks: generator of (t0, positions), from Walker.chunks, RWPopulation.chunks or WalkerEnsemble.chunks
+    :param sinks: objects with write(t0, positions) and close() methods
+    :return: number of points fed
+    """
+    count = 0
+    try:
+        for t0, positions in chunks:
+            for sink in sinks:
+                sink.write(t0, positions)
+            count = t0 + positions.shape[2]
+    finally:
+        for sink in sinks:
+            sink.close()
+    return count
@@ -4,27 +4,41 @@
 #   Description: Modeling of the random walker problem in 1D, 2D and 3D
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
-import random
 from itertools import count
 import numpy as np
+from randomSystems.ensemble import step_vectors, _draw_steps
+from randomSystems.saw import neighbours
+
+
+# unit steps of the square and cubic lattices
+_STEPS = {2: neighbours(2).tolist(), 3: neighbours(3).tolist()}
 
 
 class Walker:
+    __slots__ = ("id", "z_switch", "key", "rng", "occupied", "__path", "__length", "__position")
     _ids = count(0)
-    g_visited = []
 
-    def __init__(self, xi=0, yi=0, zi=0, i_key=None):
+    def __init__(self, xi=0, yi=0, zi=0, i_key=None, seed=None):
         """
+        The path is held in a preallocated int32 array of shape (3, capacity), grown geometrically when a walk
+        needs more room, and self.x, self.y, self.z are views of its filled part. The walker stands at the end of
+        its path, unless it was streamed since (see chunks and self.position)
         :param xi: initial x position
         :param yi: initial y position
         :param zi: initial z position
         :param i_key: instance identification key
+        :param seed: seed or numpy.random.Generator of the random steps
         """
         self.id = next(self._ids)
         self.z_switch = False
-        self.x = [xi]
-        self.y = [yi]
-        self.z = [zi]
+        self.rng = np.random.default_rng(seed)
+        # sites shared with the other walkers of a population, set by RWPopulation
+        self.occupied = None
+        self.__path = np.zeros((3, 16), dtype=np.int32)
+        self.__path[:, 0] = (xi, yi, zi)
+        self.__length = 1
+        # end of the last stream, None while the walker stands at the end of its path
+        self.__position = None
         if i_key is None:
             self.key = "walker " + str(self.id)
         else:
@@ -33,13 +47,98 @@ class Walker:
             else:
                 raise TypeError("Key value must be a string type")
 
+    @property
+    def x(self):
+        return self.__path[0, :self.__length]
+
+    @property
+    def y(self):
+        return self.__path[1, :self.__length]
+
+    @property
+    def z(self):
+        return self.__path[2, :self.__length]
+
+    @property
+    def position(self):
+        """
+        (x, y, z) coordinates the walker stands on: the end of its path, or the end of the last stream. Setting it
+        moves the walker off its path, which is left as it is, and its next walk starts a new path from there
+        """
+        if self.__position is not None:
+            return tuple(self.__position)
+        return tuple(self.__path[:, self.__length - 1].tolist())
+
+    @position.setter
+    def position(self, position):
+        self.__position = [int(c) for c in position]
+
+    def resume(self):
+        """
+        Starts a new path from the position of the walker when it was moved off its path (by a stream), so that
+        the path only ever holds unit lattice steps. Called by every walk
+        """
+        if self.__position is not None:
+            self.restart(self.__position)
+
     def reset(self):
         """
-        Resets the walker's path
+        Resets the walker's path back to its initial position
+        """
+        self.__length = 1
+        self.__position = None
+
+    def restart(self, position):
+        """
+        Replaces the walker's path with a single position
+        :param position: (x, y, z) coordinates
+        """
+        self.__path[:, 0] = position
+        self.__length = 1
+        self.__position = None
+
+    def reserve(self, num_points):
+        """
+        Makes room for num_points more points of path, at least doubling the capacity when it grows
+        :param num_points: number of points to be appended
+        """
+        needed = self.__length + num_points
+        capacity = self.__path.shape[1]
+        if needed > capacity:
+            path = np.empty((3, max(needed, 2 * capacity)), dtype=np.int32)
+            path[:, :self.__length] = self.__path[:, :self.__length]
+            self.__path = path
+
+    def extend(self, path):
+        """
+        Appends points to the walker's path
+        :param path: integer array of shape (3, num_points) of positions
         """
-        del self.x[:]
-        del self.y[:]
-        del self.z[:]
+        self.resume()
+        num_points = path.shape[1]
+        self.reserve(num_points)
+        self.__path[:, self.__length:self.__length + num_points] = path
+        self.__length += num_points
+
+    def __walk(self, num_steps, dim):
+        """
+        Appends num_steps - 1 random steps to the path, drawn and summed with numpy
+        :param num_steps: number of steps
+        :param dim: number of dimensions, 1, 2 or 3
+        """
+        self.resume()
+        codes = self.rng.integers(0, 2 * dim, size=max(0, num_steps - 1), dtype=np.int8)
+        n = self.__length
+        self.reserve(codes.size)
+        steps = self.__path[:, n:n + codes.size]
+        steps[...] = 0
+        steps[:dim] = step_vectors(codes, dim)
+        if dim == 1:
+            # the y-axis is the time axis
+            steps[1] = 1
+        np.cumsum(steps, axis=1, out=steps)
+        steps += self.__path[:, n - 1:n]
+        self.__length += codes.size
 
     def walk_1d(self, num_steps):
         """
@@ -48,13 +147,7 @@ class Walker:
         :param num_steps: number of steps
         :return: the walker path (self.x) vs time (self.y)
         """
-        for i in range(num_steps - 1):
-            r = random.randint(0, 100)
-            if r > 50:
-                self.x.append(self.x[i] + 1)
-            else:
-                self.x.append(self.x[i] - 1)
-            self.y.append(self.y[i] + 1)
+        self.__walk(num_steps, 1)
         self.z_switch = False
         return self.x, self.y
 
@@ -64,77 +157,101 @@ class Walker:
         :param num_steps: number of steps
         :return: the walker path in 2D: self.x, self.y
         """
-        for i in range(num_steps-1):
-            r = random.randint(0, 100)
-            if r <= 25:
-                self.x.append(self.x[i] + 1)
-                self.y.append(self.y[i])
-            elif 25 < r <= 50:
-                self.x.append(self.x[i] - 1)
-                self.y.append(self.y[i])
-            elif 50 < r <= 75:
-                self.y.append(self.y[i] + 1)
-                self.x.append(self.x[i])
-            else:
-                self.y.append(self.y[i] - 1)
-                self.x.append(self.x[i])
+        self.__walk(num_steps, 2)
         self.z_switch = False
         return self.x, self.y
 
-    def saw_2d(self, num_steps, avoid_all=False):
+    def chunks(self, num_steps, dim=2, chunk_size=65536):
         """
-        Calculates self avoiding walker path in 2D
+        Generates a random walk a chunk of positions at a time, in constant memory whatever its length.
+            - The walk carries on from the position of the walker. The points streamed are not stored and the
+              path is left as it is: once the stream is over, the walker stands on its final point
+              (self.position), and its next walk starts a new path from there
+            - Chunks can be fed to sinks with randomSystems.sinks.feed
+        :param num_steps: number of points of the walk, the starting point included
+        :param dim: number of dimensions, 1, 2 or 3 (in 1D the y-axis is the time axis)
+        :param chunk_size: number of points per chunk
+        :return: generator of (t0, positions), positions being an int64 array of shape (3, 1, T) holding the points
+                 t0 to t0 + T - 1 of the walk
+        """
+        self.z_switch = dim == 3
+        last = np.array(self.position, dtype=np.int64).reshape(3, 1, 1)
+        for t0 in range(0, num_steps, chunk_size):
+            size = min(chunk_size, num_steps - t0)
+            if t0 == 0:
+                positions = np.concatenate([np.zeros_like(last), _draw_steps(self.rng, 1, size - 1, dim)], axis=2)
+            else:
+                positions = _draw_steps(self.rng, 1, size, dim)
+            np.cumsum(positions, axis=2, out=positions)
+            positions += last
+            last = positions[:, :, -1:].copy()
+            yield t0, positions
+        if num_steps > 1:
+            self.position = last[:, 0, 0]
+
+    def sites(self, dim):
+        """
+        Lattice sites of the walker's path
+        :param dim: number of dimensions, 2 or 3
+        :return: iterator of tuples
+        """
+        return zip(*self.__path[:dim, :self.__length].tolist())
+
+    def saw_step(self, dim, visited, r):
+        """
+        Takes one self avoiding step to a neighbour not in visited, and marks it visited
+        :param dim: number of dimensions, 2 or 3
+        :param visited: set of the visited sites, as tuples
+        :param r: uniform random number in [0, 1) choosing among the free neighbours
+        :return: False if the walker is trapped, and then stays put
+        """
+        self.resume()
+        n = self.__length
+        site = self.__path[:dim, n - 1].tolist()
+        free = [s for s in (tuple(a + b for a, b in zip(site, step)) for step in _STEPS[dim]) if s not in visited]
+        if not free:
+            return False
+        site = free[int(r * len(free))]
+        visited.add(site)
+        self.reserve(1)
+        self.__path[:dim, n] = site
+        self.__path[dim:, n] = self.__path[dim:, n - 1]
+        self.__length = n + 1
+        return True
+
+    def __saw(self, num_steps, dim, avoid_all):
+        """
+        Appends up to num_steps - 1 self avoiding steps to the path: every step goes to a uniformly chosen
+        neighbour not visited yet, and the walk ends early when the walker is trapped
         :param num_steps: number of steps
+        :param dim: number of dimensions, 2 or 3
         :param avoid_all: Enables/disables avoiding the paths of other walker instances, as opposed to just self-avoid
-        :return: the walker path in 2D: self.x, self.y
         """
-
         if avoid_all is True:
-            visited = self.g_visited
+            if self.occupied is None:
+                raise ValueError("Avoiding other walkers needs the walker to belong to an RWPopulation")
+            visited = self.occupied
         else:
-            visited = []
-        for i in range(num_steps - 1):
-            r = random.randint(0, 100)
-            if r <= 25:
-                if (self.x[i] + 1, self.y[i]) in visited:
-                    self.x.append(self.x[i])
-                    self.y.append(self.y[i])
-                    continue
-                else:
-                    self.x.append(self.x[i] + 1)
-                    self.y.append(self.y[i])
-                    visited.append((self.x[i] + 1, self.y[i]))
-            elif 25 < r <= 50:
-                if (self.x[i] - 1, self.y[i]) in visited:
-                    self.x.append(self.x[i])
-                    self.y.append(self.y[i])
-                    continue
-                else:
-                    self.x.append(self.x[i] - 1)
-                    self.y.append(self.y[i])
-                    visited.append((self.x[i] - 1, self.y[i]))
-            elif 50 < r <= 75:
-                if (self.x[i], self.y[i] + 1) in visited:
-                    self.x.append(self.x[i])
-                    self.y.append(self.y[i])
-                    continue
-                else:
-                    self.y.append(self.y[i] + 1)
-                    self.x.append(self.x[i])
-                    visited.append((self.x[i], self.y[i] + 1))
-            else:
-                if (self.x[i], self.y[i] - 1) in visited:
-                    self.x.append(self.x[i])
-                    self.y.append(self.y[i])
-                    continue
-                else:
-                    self.y.append(self.y[i] - 1)
-                    self.x.append(self.x[i])
-                    visited.append((self.x[i], self.y[i] - 1))
-        if avoid_all is True:
-            self.g_visited = visited
+            visited = set()
+        self.resume()
+        visited.update(self.sites(dim))
+        u = self.rng.random(max(0, num_steps - 1)).tolist()
+        self.reserve(len(u))
+        for r in u:
+            if not self.saw_step(dim, visited, r):
+                break
+
+    def saw_2d(self, num_steps, avoid_all=False):
+        """
+        Calculates self avoiding walker path in 2D, which ends early if the walker gets trapped.
+            - Long self avoiding walks are sampled far more efficiently with randomSystems.saw.PivotSAW
+        :param num_steps: number of steps
+        :param avoid_all: Enables/disables avoiding the paths of the other walkers of its RWPopulation, as opposed to
+                          just self-avoid
+        :return: the walker path in 2D: self.x, self.y
+        """
+        self.__saw(num_steps, 2, avoid_all)
         self.z_switch = False
-        print(len(self.x), len(self.y))
         return self.x, self.y
 
     def walk_3d(self, num_steps):
@@ -143,122 +260,20 @@ class Walker:
         :param num_steps: number of steps
         :return: the walker path in 3D: self.x, self.y, self.z
         """
-        for i in range(num_steps-1):
-            r = random.randint(0, 100)
-            if r <= 16.66:
-                self.x.append(self.x[i] + 1)
-                self.y.append(self.y[i])
-                self.z.append(self.z[i])
-            elif 16.66 < r <= 33.32:
-                self.x.append(self.x[i] - 1)
-                self.y.append(self.y[i])
-                self.z.append(self.z[i])
-            elif 33.32 < r <= 49.98:
-                self.y.append(self.y[i] + 1)
-                self.x.append(self.x[i])
-                self.z.append(self.z[i])
-            elif 49.98 < r <= 66.64:
-                self.y.append(self.y[i] - 1)
-                self.x.append(self.x[i])
-                self.z.append(self.z[i])
-            elif 66.64 < r < 83.33:
-                self.z.append(self.z[i] + 1)
-                self.x.append(self.x[i])
-                self.y.append(self.y[i])
-            else:
-                self.z.append(self.z[i] - 1)
-                self.x.append(self.x[i])
-                self.y.append(self.y[i])
+        self.__walk(num_steps, 3)
         self.z_switch = True
         return self.x, self.y, self.z
 
     def saw_3d(self, num_steps, avoid_all):
         """
-        Calculates self avoiding walker path in 3D
+        Calculates self avoiding walker path in 3D, which ends early if the walker gets trapped.
+            - Long self avoiding walks are sampled far more efficiently with randomSystems.saw.PivotSAW
         :param num_steps: number of steps
-        :param avoid_all: Enables/disables avoiding the paths of other walker instances, as opposed to just self-avoid
+        :param avoid_all: Enables/disables avoiding the paths of the other walkers of its RWPopulation, as opposed to
+                          just self-avoid
         :return: the walker path in 3D: self.x, self.y, self.z
         """
-
-        if avoid_all is True:
-            visited = self.g_visited
-        else:
-            visited = []
-
-        for i in range(num_steps-1):
-            r = random.randint(0, 100)
-            # -------------------------- +X --------------------------#
-            if r <= 16.66:
-                if (self.x[i] + 1, self.y[i], self.z[i]) in visited:
-                    self.x.append(self.x[i])
-                    self.y.append(self.y[i])
-                    self.z.append(self.z[i])
-                    continue
-                else:
-                    self.x.append(self.x[i] + 1)
-                    self.y.append(self.y[i])
-                    self.z.append(self.z[i])
-                    visited.append((self.x[i] + 1, self.y[i], self.z[i]))
-            # -------------------------- -X --------------------------#
-            elif 16.66 < r <= 33.32:
-                if (self.x[i] - 1, self.y[i], self.z[i]) in visited:
-                    self.x.append(self.x[i])
-                    self.y.append(self.y[i])
-                    self.z.append(self.z[i])
-                    continue
-                else:
-                    self.x.append(self.x[i] - 1)
-                    self.y.append(self.y[i])
-                    self.z.append(self.z[i])
-                    visited.append((self.x[i] - 1, self.y[i], self.z[i]))
-            # -------------------------- +Y --------------------------#
-            elif 33.32 < r <= 49.98:
-                if (self.x[i], self.y[i] + 1, self.z[i]) in visited:
-                    self.y.append(self.y[i])
-                    self.x.append(self.x[i])
-                    self.z.append(self.z[i])
-                    continue
-                else:
-                    self.x.append(self.x[i])
-                    self.y.append(self.y[i] + 1)
-                    self.z.append(self.z[i])
-                    visited.append((self.x[i], self.y[i] + 1, self.z[i]))
-            # -------------------------- -Y --------------------------#
-            elif 49.98 < r <= 66.64:
-                if (self.x[i], self.y[i] - 1, self.z[i]) in visited:
-                    self.y.append(self.y[i])
-                    self.x.append(self.x[i])
-                    self.z.append(self.z[i])
-                    continue
-                else:
-                    self.x.append(self.x[i])
-                    self.y.append(self.y[i] - 1)
-                    self.z.append(self.z[i])
-                    visited.append((self.x[i], self.y[i] - 1, self.z[i]))
-            # -------------------------- +Z --------------------------#
-            elif 66.64 < r < 83.33:
-                if (self.x[i], self.y[i], self.z[i] + 1) in visited:
-                    self.x.append(self.x[i])
-                    self.y.append(self.y[i])
-                    self.z.append(self.z[i])
-                    continue
-                else:
-                    self.x.append(self.x[i])
-                    self.y.append(self.y[i])
-                    self.z.append(self.z[i] + 1)
-                    visited.append((self.x[i], self.y[i], self.z[i] + 1))
-            # -------------------------- -Z --------------------------#
-            else:
-                if (self.x[i], self.y[i], self.z[i] - 1) in visited:
-                    self.x.append(self.x[i])
-                    self.y.append(self.y[i])
-                    self.z.append(self.z[i])
-                    continue
-                else:
-                    self.x.append(self.x[i])
-                    self.y.append(self.y[i])
-                    self.z.append(self.z[i] + 1)
-                    visited.append((self.x[i], self.y[i], self.z[i] - 1))
+        self.__saw(num_steps, 3, avoid_all)
         self.z_switch = True
         return self.x, self.y, self.z
 
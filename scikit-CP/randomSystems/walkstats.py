@@ -0,0 +1,165 @@
+#   File: walkstats.py
+#   Author: Nawaf Abdullah
+#   Creation Date: 17/October/2026
+#   Description: Streaming statistics of random walks, updated chunk by chunk without storing the paths
+import numpy as np
+
+
+class WalkStatistics:
+    def __init__(self, num_walkers, num_steps, dim=2, times=None, num_bins=50, max_distance=None,
+                 checkpoint_every=None):
+        """
+        Online accumulators of the statistics of a population of random walks.
+            - Mean squared displacement vs. time with Welford's algorithm, merged across chunks of walkers
+              and chunks of steps (Chan's parallel update), at a set of sampled times
+            - Histogram of the distance from the starting point at every sampled time
+            - First return time to the starting point of every walker, for the return probability
+            - Optional checkpoints of the positions every checkpoint_every steps, a downsampled path
+        Memory only depends on the number of walkers and of sampled times, never on the length of the walks.
+        :param num_walkers: number of walkers
+        :param num_steps: number of points of every path, the starting point included
+        :param dim: number of dimensions, 1, 2 or 3
+        :param times: step numbers at which the statistics are sampled, 50 log-spaced times by default
+        :param num_bins: number of bins of the distance histograms
+        :param max_distance: upper edge of the histograms, 5 * sqrt(num_steps) by default. Larger distances
+                             are counted in the last bin
+        :param checkpoint_every: stores the positions of every walker every n steps, None for no checkpoints
+        """
+        self.num_walkers = num_walkers
+        self.dim = dim
+        if times is None:
+            times = np.geomspace(1, max(1, num_steps - 1), 50).astype(int)
+        self.times = np.unique(np.asarray(times, dtype=np.int64))
+        if max_distance is None:
+            max_distance = 5 * np.sqrt(num_steps)
+        self.edges = np.linspace(0, max_distance, num_bins + 1)
+        self.histogram = np.zeros((self.times.size, num_bins), dtype=np.int64)
+        self.count = np.zeros(self.times.size, dtype=np.int64)
+        self.mean = np.zeros(self.times.size)
+        self.M2 = np.zeros(self.times.size)
+        self.first_return = np.full(num_walkers, -1, dtype=np.int64)
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_times = []
+        self.checkpoints = []
+
+    def update(self, displacement, t0, first=0):
+        """
+        Adds a chunk of walks to the statistics
+        :param displacement: integer array of shape (dim, W, T), displacement from the starting point of the
+                             walkers first to first + W - 1 at the steps t0 to t0 + T - 1
+        :param t0: step number of the first point of the chunk
+        :param first: index of the first walker of the chunk
+        """
+        dim, W, T = displacement.shape
+        walkers = slice(first, first + W)
+
+        sampled = (self.times >= t0) & (self.times < t0 + T)
+        if sampled.any():
+            r2 = np.sum(displacement[:, :, self.times[sampled] - t0].astype(np.float64) ** 2, axis=0)
+            # Chan's update: merges the mean and M2 of the chunk into the running ones
+            n_a = self.count[sampled]
+            mean_b = r2.mean(axis=0)
+            M2_b = np.sum((r2 - mean_b) ** 2, axis=0)
+            n = n_a + W
+            delta = mean_b - self.mean[sampled]
+            self.mean[sampled] += delta * W / n
+            self.M2[sampled] += M2_b + delta ** 2 * n_a * W / n
+            self.count[sampled] = n
+
+            bins = np.searchsorted(self.edges, np.sqrt(r2), side="right") - 1
+            bins = np.clip(bins, 0, self.edges.size - 2)
+            rows = np.flatnonzero(sampled)
+            for column, row in enumerate(rows):
+                self.histogram[row] += np.bincount(bins[:, column], minlength=self.edges.size - 1)
+
+        at_origin = np.all(displacement == 0, axis=0)
+        if t0 == 0:
+            at_origin[:, 0] = False
+        returned = at_origin.any(axis=1) & (self.first_return[walkers] < 0)
+        self.first_return[walkers][returned] = t0 + np.argmax(at_origin[returned], axis=1)
+
+        if self.checkpoint_every is not None:
+            start = -(-t0 // self.checkpoint_every) * self.checkpoint_every
+            for t in range(start, t0 + T, self.checkpoint_every):
+                if first == 0:
+                    self.checkpoint_times.append(t)
+                    self.checkpoints.append(np.empty((dim, self.num_walkers), dtype=displacement.dtype))
+                self.checkpoints[self.checkpoint_times.index(t)][:, walkers] = displacement[:, :, t - t0]
+
+    def spawn(self, num_walkers):
+        """
+        Empty statistics with the same sampled times, bins and checkpoints, for a block of walkers
+        :param num_walkers: number of walkers of the block
+        :return: WalkStatistics
+        """
+        return WalkStatistics(num_walkers, 0, self.dim, self.times, self.edges.size - 1, self.edges[-1],
+                              self.checkpoint_every)
+
+    def merge(self, other, first=0):
+        """
+        Adds the statistics of a block of walkers accumulated on their own (see spawn)
+        :param other: WalkStatistics of the block
+        :param first: index of the first walker of the block
+        """
+        n_a, n_b = self.count, other.count
+        n = n_a + n_b
+        with np.errstate(divide="ignore", invalid="ignore"):
+            delta = other.mean - self.mean
+            self.mean = np.where(n > 0, self.mean + delta * n_b / n, 0.0)
+            self.M2 = np.where(n > 0, self.M2 + other.M2 + delta ** 2 * n_a * n_b / n, 0.0)
+        self.count = n
+        self.histogram += other.histogram
+        self.first_return[first:first + other.num_walkers] = other.first_return
+        for t, positions in zip(other.checkpoint_times, other.checkpoints):
+            if t not in self.checkpoint_times:
+                self.checkpoint_times.append(t)
+                self.checkpoints.append(np.empty((self.dim, self.num_walkers), dtype=positions.dtype))
+            self.checkpoints[self.checkpoint_times.index(t)][:, first:first + other.num_walkers] = positions
+
+    def msd(self):
+        """
+        Mean squared displacement at the sampled times
+        :return: times and mean squared displacements
+        """
+        return self.times, self.mean.copy()
+
+    def msd_variance(self):
+        """
+        Sample variance of the squared displacement at the sampled times
+        """
+        return self.M2 / np.maximum(self.count - 1, 1)
+
+    def diffusion_coefficient(self):
+        """
+        Least squares fit of <r^2> = 2 * dim * D * t over the sampled times
+        :return: diffusion coefficient D in lattice units
+        """
+        t = self.times.astype(np.float64)
+        return float(np.dot(t, self.mean) / np.dot(t, t)) / (2 * self.dim)
+
+    def distance_distribution(self, time=None):
+        """
+        Normalized distribution of the distance from the starting point
+        :param time: sampled step number, the last one by default
+        :return: bin edges and probability density
+        """
+        row = -1 if time is None else int(np.searchsorted(self.times, time))
+        counts = self.histogram[row]
+        return self.edges, counts / max(1, counts.sum()) / np.diff(self.edges)
+
+    def return_probability(self):
+        """
+        Fraction of the walkers that came back to their starting point at least once, by every sampled time
+        :return: times and probabilities
+        """
+        returned = self.first_return[self.first_return > 0]
+        return self.times, np.searchsorted(np.sort(returned), self.times, side="right") / self.num_walkers
+
+    def path_checkpoints(self):
+        """
+        Downsampled paths kept from the checkpoints
+        :return: times and displacements as an array of shape (dim, num_walkers, num_checkpoints)
+        """
+        if not self.checkpoints:
+            return np.array([], dtype=np.int64), np.zeros((self.dim, self.num_walkers, 0))
+        return np.array(self.checkpoint_times), np.stack(self.checkpoints, axis=2)